@@ -0,0 +1,145 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import datetime
+import subprocess
+import pandas as pd
+import openpyxl
+
+# ==========================================
+# BENCHMARK: EXPORTACIÓN DEL REPORTE FINAL (ANTES vs STREAMING)
+# ==========================================
+# Escribe un REPORTE_FINAL_COMPLETO sintético de distintos tamaños de dos formas:
+#   antes:     lista con todas las filas -> DataFrame -> pd.ExcelWriter + add_table
+#   streaming: lotes de filas -> exportacion.LibroExcel (xlsxwriter constant_memory)
+# Cada medición corre en un proceso aparte para que la memoria máxima (RSS) sea solo suya.
+# Antes de medir se comprueba (con openpyxl) que el archivo en streaming sí trae la tabla:
+# LibroExcel la declara tocando un atributo interno de xlsxwriter (versión fijada en
+# requirements.txt) y una versión nueva podría dejar la hoja sin tabla en silencio.
+#
+# Uso:  python benchmarks/bench_exportacion.py                 (50k, 100k y 200k filas)
+#       python benchmarks/bench_exportacion.py --filas 500000
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from exportacion import LibroExcel # noqa: E402
+from bench_scraper import memoria_maxima_mb # noqa: E402
+
+COLUMNAS = ['ID', 'Curso', 'Docente', 'Nombre Video', 'Fecha', 'Hora', 'Duración (min)', 'Link']
+LOTE = 5000
+FECHA_BASE = datetime.datetime(2025, 3, 3, 19, 0)
+
+
+def filas_sinteticas(cantidad):
+    """Filas con la forma de filas_reporte() (12 grabaciones por curso)."""
+    for i in range(cantidad):
+        curso = i // 12
+        fecha = FECHA_BASE + datetime.timedelta(days=7 * (i % 12), minutes=i % 97)
+        yield {
+            'ID': f"{220000 + curso}.{1000 + curso % 90}",
+            'Curso': f"CURSO SINTÉTICO {curso}",
+            'Docente': f"DOCENTE {curso}",
+            'Nombre Video': f"Sesión {i % 12 + 1} - curso {curso}",
+            'Fecha': fecha,
+            'Hora': fecha.time(),
+            'Duración (min)': round((45 + i % 120) * 1.0, 1),
+            'Link': f"https://us.bbcollab.com/guest/{curso}-{i % 12}",
+        }
+
+
+def exportar_antes(ruta, cantidad):
+    df = pd.DataFrame(list(filas_sinteticas(cantidad)))
+    df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce').dt.normalize()
+    with pd.ExcelWriter(ruta, engine='xlsxwriter', datetime_format='dd/mm/yyyy') as writer:
+        df.to_excel(writer, sheet_name='Reporte', index=False)
+        worksheet = writer.sheets['Reporte']
+        worksheet.add_table(0, 0, len(df), len(df.columns) - 1, {
+            'columns': [{'header': c} for c in df.columns], 'style': 'TableStyleMedium2', 'name': 'TablaReporteCompleto'
+        })
+        worksheet.set_column(0, len(df.columns) - 1, 15, writer.book.add_format({'align': 'center', 'valign': 'vcenter'}))
+
+
+def exportar_streaming(ruta, cantidad):
+    with LibroExcel(ruta) as libro:
+        tabla = libro.agregar_tabla('Reporte', COLUMNAS, filas=cantidad, nombre_tabla='TablaReporteCompleto')
+        tabla.hoja.set_column(0, len(COLUMNAS) - 1, 15, libro.formato({'align': 'center', 'valign': 'vcenter'}))
+        lote = []
+        for fila in filas_sinteticas(cantidad):
+            lote.append(fila)
+            if len(lote) >= LOTE:
+                tabla.escribir_df(_limpiar(lote))
+                lote = []
+        if lote:
+            tabla.escribir_df(_limpiar(lote))
+
+
+def _limpiar(lote):
+    df = pd.DataFrame(lote, columns=COLUMNAS)
+    df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce').dt.normalize()
+    return df
+
+
+def verificar_tabla(cantidad=100):
+    """Escribe un reporte chico en streaming y lo relee con openpyxl. Devuelve el error o None si la tabla está bien."""
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "reporte.xlsx")
+        exportar_streaming(ruta, cantidad)
+        libro = openpyxl.load_workbook(ruta)
+        tablas = libro['Reporte'].tables
+        libro.close()
+    if 'TablaReporteCompleto' not in tablas:
+        return f"la hoja 'Reporte' no tiene la tabla TablaReporteCompleto (tablas: {list(tablas)})"
+    esperado = f"A1:{openpyxl.utils.get_column_letter(len(COLUMNAS))}{cantidad + 1}"
+    if tablas['TablaReporteCompleto'].ref != esperado:
+        return f"la tabla cubre {tablas['TablaReporteCompleto'].ref} en vez de {esperado}"
+    return None
+
+
+def medir_en_proceso(modo, cantidad):
+    """Corre una medición en un proceso nuevo. Devuelve segundos, RSS máximo y tamaño del archivo."""
+    salida = subprocess.run([sys.executable, os.path.abspath(__file__), "--hijo", modo, "--filas", str(cantidad)],
+                            capture_output=True, text=True, check=True)
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def hijo(modo, cantidad):
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "reporte.xlsx")
+        base = memoria_maxima_mb()
+        inicio = time.perf_counter()
+        (exportar_antes if modo == 'antes' else exportar_streaming)(ruta, cantidad)
+        segundos = time.perf_counter() - inicio
+        print(json.dumps({'segundos': segundos, 'rss_mb': memoria_maxima_mb(), 'rss_base_mb': base,
+                          'mb_archivo': os.path.getsize(ruta) / 1e6}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la exportación del reporte final")
+    parser.add_argument("--filas", type=int, nargs="+", default=[50_000, 100_000, 200_000])
+    parser.add_argument("--hijo", choices=['antes', 'streaming'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.hijo:
+        return hijo(args.hijo, args.filas[0])
+
+    error = verificar_tabla()
+    if error:
+        print(f"❌ La exportación en streaming no declaró la tabla de Excel: {error}")
+        sys.exit(1)
+    print("✅ Tabla de Excel verificada con openpyxl.\n")
+
+    print(f"{'Filas':>9} | {'Antes (s)':>9} {'RSS (MB)':>9} | {'Streaming (s)':>13} {'RSS (MB)':>9}")
+    for cantidad in args.filas:
+        antes = medir_en_proceso('antes', cantidad)
+        nuevo = medir_en_proceso('streaming', cantidad)
+        print(f"{cantidad:>9,} | {antes['segundos']:>9.2f} {antes['rss_mb']:>9.0f} | "
+              f"{nuevo['segundos']:>13.2f} {nuevo['rss_mb']:>9.0f}")
+    print("\nRSS = memoria máxima del proceso (incluye ~ la base de Python + pandas importados).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import importlib
+import contextlib
+import numpy as np
+
+# ==========================================
+# BENCHMARK: MAPA DE LLAVES + ROBOT CONTRA EL SERVIDOR FALSO
+# ==========================================
+# Levanta benchmarks/servidor_falso.py en un hilo, apunta los scripts hacia él
+# (BB_BASE_URL / COLLAB_BASE_URL) y mide sin red ni sesión de UPN:
+#   1) 02_mapa_llaves: parseo de /memberships y refresco paginado del mapa (completo y sin cambios)
+#   2) 03_bot_scraper: token (caché o lanzamiento LTI) -> /recordings paginado -> almacén -> Excel final
+# Reporta cursos/s, latencia p50/p95 por curso y memoria máxima (RSS) del proceso.
+#
+# Uso:  python benchmarks/bench_scraper.py
+#       python benchmarks/bench_scraper.py --cursos 1000 --latencia 120 --error 0.02 --modo-api
+#       python benchmarks/bench_scraper.py --hilos 32 --limite 40       (429 con Retry-After: el robot se adapta)
+#       python benchmarks/bench_scraper.py --min-cursos-seg 20 --json resultado.json   (para CI)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from servidor_falso import iniciar_servidor, id_interno # noqa: E402
+
+
+def memoria_maxima_mb():
+    """RSS máximo del proceso en MB (None si el sistema no lo informa)."""
+    try:
+        import resource
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo / (1024 * 1024) if sys.platform == 'darwin' else maximo / 1024 # macOS: bytes, Linux: KB
+    except ImportError:
+        pass
+    try:
+        import psutil # Windows (opcional)
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+
+def percentiles(latencias):
+    if not latencias:
+        return 0.0, 0.0
+    p50, p95 = np.percentile(latencias, [50, 95])
+    return float(p50), float(p95)
+
+
+def medir_mapa(mapa, url_base, repeticiones, carpeta):
+    """Parseo de /memberships en una sola página y refresco paginado del mapa (completo y sin cambios)."""
+    import requests
+    from sesion_http import crear_sesion
+    from almacen_mapa import abrir_mapa
+    data = requests.get(url_base + mapa.RUTA_MEMBRESIAS.format(usuario=mapa.USER_ID_BB, limite=10000), timeout=60).json()
+    mejor, df = float('inf'), None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        df = mapa.parsear_membresias(data)
+        mejor = min(mejor, time.perf_counter() - inicio)
+
+    # Refresco por páginas contra una base vacía y luego otra vez (nada que actualizar)
+    con = abrir_mapa(os.path.join(carpeta, "mapa_llaves.db"))
+    refrescos = []
+    try:
+        for _ in range(2):
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                leidos, nuevos, cambiados = mapa.descargar_membresias(con, crear_sesion())
+            refrescos.append({'segundos': time.perf_counter() - inicio, 'nuevos': nuevos, 'cambiados': cambiados})
+    finally:
+        con.close()
+    return {'cursos': len(df), 'segundos': mejor, 'cursos_seg': len(df) / mejor if mejor else 0.0,
+            'refresco_completo': refrescos[0], 'refresco_sin_cambios': refrescos[1]}
+
+
+def medir_robot(bot, cursos, hilos, modo_api, carpeta, tasa=None):
+    """Corre cosechar() + exportar_reporte() del robot (sin Chrome) y mide cada curso con su telemetría."""
+    # Todo lo que escribe el robot va a una carpeta temporal
+    bot.ARCHIVO_SALIDA = os.path.join(carpeta, "REPORTE_FINAL_COMPLETO.xlsx")
+    bot.ARCHIVO_CHECKPOINT = os.path.join(carpeta, "checkpoint_bot.jsonl")
+    bot.ARCHIVO_CACHE_TOKENS = os.path.join(carpeta, "cache_tokens.json")
+    bot.ARCHIVO_CACHE_REPORTE = os.path.join(carpeta, "cache_reporte.db")
+    bot.args = bot.crear_parser().parse_args(["--hilos", str(hilos)] + (["--modo-api"] if modo_api else [])
+                                             + (["--tasa", str(tasa)] if tasa else []))
+    # Sin --modo-api todos los cursos tienen token vigente en caché (no se abre Chrome)
+    vence = time.time() + 3600
+    bot.cache = {} if modo_api else {c['ID_Interno']: {'token': f"Bearer falso-{c['ID_Interno']}", 'exp': vence} for c in cursos}
+    bot.almacen = bot.abrir_almacen(os.path.join(carpeta, "grabaciones.db"))
+    bot.marcas = {c['ID_Interno']: bot.obtener_marca(bot.almacen, c['ID_Interno']) for c in cursos}
+    bot.cliente_api = bot.ClienteAPI(bot.crear_sesion(conexiones=hilos, reintentos=False), bot.LimitadorAdaptativo(bot.args.tasa))
+    bot.estado_http['cliente'] = bot.ClienteAPI(bot.crear_sesion("falsa=1", conexiones=hilos, reintentos=False),
+                                                bot.cliente_api.limitador) if modo_api else None
+    bot.reintentar.clear()
+    bot.fallidos.clear()
+    bot.telemetria = bot.Telemetria('robot') # solo en memoria
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()): # sin una línea por curso en la consola
+            inicio = time.perf_counter()
+            bot.cosechar(cursos)
+            t_api = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            filas = bot.exportar_reporte(cursos)
+            t_export = time.perf_counter() - inicio
+
+            # Segunda exportación sin cambios: todas las filas salen de la caché del reporte
+            inicio = time.perf_counter()
+            bot.exportar_reporte(cursos)
+            t_export_cache = time.perf_counter() - inicio
+    finally:
+        bot.almacen.close()
+
+    # Latencia de cada curso = suma de sus tramos (token LTI, API con esperas del limitador, parseo, guardado)
+    por_curso = {}
+    for r in bot.telemetria.registros:
+        if r.get('curso') is not None:
+            por_curso[r['curso']] = por_curso.get(r['curso'], 0.0) + r['segundos']
+    p50, p95 = percentiles(list(por_curso.values()))
+    with open(bot.ARCHIVO_CHECKPOINT, encoding='utf-8') as f:
+        estados = [json.loads(linea)['estado'] for linea in f]
+    return {
+        'cursos': len(cursos), 'cursos_ok': estados.count('ok'), 'grabaciones': filas or 0,
+        'segundos_api': t_api, 'segundos_export': t_export, 'segundos_export_cache': t_export_cache,
+        'cursos_seg': len(cursos) / t_api if t_api else 0.0,
+        'p50_ms': p50 * 1000, 'p95_ms': p95 * 1000, **bot.cliente_api.stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del mapa de llaves y del robot contra un servidor falso")
+    parser.add_argument("--cursos", type=int, default=300)
+    parser.add_argument("--grabaciones", type=int, default=12, help="Grabaciones por curso")
+    parser.add_argument("--latencia", type=float, default=50, help="Latencia media por petición (ms)")
+    parser.add_argument("--error", type=float, default=0.0, help="Fracción de peticiones que fallan con 503")
+    parser.add_argument("--limite", type=int, default=0, help="Peticiones/s del servidor antes de responder 429 (0 = sin límite)")
+    parser.add_argument("--hilos", type=int, default=8, help="Llamadas simultáneas del robot")
+    parser.add_argument("--tasa", type=float, help="Peticiones/s iniciales del limitador del robot (por defecto la del robot)")
+    parser.add_argument("--modo-api", action="store_true", help="Tokens por lanzamiento LTI en vez de caché")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--json", help="Guardar los resultados en este archivo")
+    parser.add_argument("--min-cursos-seg", type=float, help="Falla (código 1) si el robot procesa menos cursos/s")
+    parser.add_argument("--max-p95-ms", type=float, help="Falla (código 1) si la latencia p95 por curso es mayor")
+    args = parser.parse_args()
+
+    servidor, url_base = iniciar_servidor(0, args.cursos, args.grabaciones, args.latencia, args.error, args.limite)
+    # Los módulos leen las URLs al importarse: se apuntan al servidor falso antes
+    os.environ["BB_BASE_URL"] = url_base
+    os.environ["COLLAB_BASE_URL"] = url_base
+    mapa = importlib.import_module("02_mapa_llaves")
+    bot = importlib.import_module("03_bot_scraper")
+
+    print(f"🧪 Servidor falso en {url_base} | {args.cursos} cursos x {args.grabaciones} grabaciones | "
+          f"latencia {args.latencia:.0f} ms | errores {args.error:.0%} | límite {args.limite or '∞'} req/s")
+    try:
+        cursos = [{'index': n, 'ID': f"{220000 + n}.{1000 + n % 90}", 'ID_Interno': id_interno(n),
+                   'Curso': f"CURSO SINTÉTICO {n}", 'Docente': f"DOCENTE {n}"} for n in range(args.cursos)]
+        with tempfile.TemporaryDirectory() as carpeta:
+            r_mapa = medir_mapa(mapa, url_base, args.repeticiones, carpeta)
+            print(f"\n🗺️ Mapa de llaves: {r_mapa['cursos']:,} cursos parseados en {r_mapa['segundos']:.3f} s "
+                  f"({r_mapa['cursos_seg']:,.0f} cursos/s)")
+            completo, sin_cambios = r_mapa['refresco_completo'], r_mapa['refresco_sin_cambios']
+            print(f"   Refresco por páginas de {mapa.LIMITE_PAGINA}: {completo['segundos']:.2f} s ({completo['nuevos']:,} nuevos) | "
+                  f"sin cambios: {sin_cambios['segundos']:.2f} s ({sin_cambios['nuevos'] + sin_cambios['cambiados']} escritos)")
+            r_bot = medir_robot(bot, cursos, args.hilos, args.modo_api, carpeta, args.tasa)
+    finally:
+        servidor.shutdown()
+
+    rss = memoria_maxima_mb()
+    modo = "LTI por HTTP" if args.modo_api else "token en caché"
+    print(f"🤖 Robot ({modo}, {args.hilos} hilos): {r_bot['cursos']:,} cursos en {r_bot['segundos_api']:.2f} s "
+          f"-> {r_bot['cursos_seg']:.1f} cursos/s")
+    print(f"   Cursos completos: {r_bot['cursos_ok']}/{r_bot['cursos']} | peticiones {r_bot['peticiones']} | "
+          f"reintentos {r_bot['reintentos']} | 429 {r_bot['limitadas']}")
+    print(f"   Latencia por curso: p50 {r_bot['p50_ms']:.0f} ms | p95 {r_bot['p95_ms']:.0f} ms")
+    print(f"   Exportación: {r_bot['grabaciones']:,} grabaciones en {r_bot['segundos_export']:.2f} s | sin cambios (caché): {r_bot['segundos_export_cache']:.2f} s")
+    print(f"💾 Memoria máxima (RSS): {'n/d' if rss is None else f'{rss:.0f} MB'}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'mapa': r_mapa, 'robot': r_bot, 'rss_mb': rss}, f, indent=2)
+
+    fallas = []
+    if args.min_cursos_seg is not None and r_bot['cursos_seg'] < args.min_cursos_seg:
+        fallas.append(f"{r_bot['cursos_seg']:.1f} cursos/s < {args.min_cursos_seg}")
+    if args.max_p95_ms is not None and r_bot['p95_ms'] > args.max_p95_ms:
+        fallas.append(f"p95 {r_bot['p95_ms']:.0f} ms > {args.max_p95_ms} ms")
+    if fallas:
+        print("\n❌ Rendimiento fuera de umbral: " + "; ".join(fallas))
+        sys.exit(1)
+    print("\n✅ Benchmark completado.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import json
+import random
+import threading
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# ==========================================
+# SERVIDOR FALSO DE BLACKBOARD / COLLABORATE
+# ==========================================
+# Imita las respuestas que usan los scripts 02 y 03 para medir su rendimiento sin
+# sesión de UPN ni red:
+#   GET  /learn/api/v1/users/{id}/memberships                -> cursos del usuario (paginado)
+#   GET  /learn/api/public/v3/courses?courseId=               -> búsqueda puntual de cursos
+#   GET  /learn/api/public/v1/users/me                        -> 200 si llegan cookies (sesión vigente)
+#   GET  /webapps/collab-ultra/tool/collabultra/lti/launch   -> formulario LTI (--modo-api)
+#   POST /lti                                                 -> redirección con ?token=
+#   GET  /collab/api/csa/recordings                           -> grabaciones del curso del token
+# La latencia, la tasa de errores (503), el límite de peticiones por segundo (429 con
+# Retry-After) y el tamaño de los datos son configurables.
+#
+# Uso:  python benchmarks/servidor_falso.py --puerto 8765 --cursos 500 --latencia 80
+#       (luego BB_BASE_URL / COLLAB_BASE_URL = http://127.0.0.1:8765)
+
+FECHA_BASE = datetime(2024, 3, 1, 7, 0, tzinfo=timezone.utc)
+
+
+def id_interno(numero):
+    return f"_{100000 + numero}_1"
+
+
+def curso_de_membresia(numero):
+    """Curso con la misma forma que devuelve /memberships (courseId 'AAAA.PP.NRC.SEDE')."""
+    return {
+        'id': f"m{numero}",
+        'courseRole': 'Instructor',
+        'course': {
+            'id': id_interno(numero),
+            'courseId': f"2025.02.{220000 + numero}.{1000 + numero % 90}",
+            'displayName': f"CURSO SINTÉTICO {numero}",
+            'effectiveAvailability': {'available': 'Yes'},
+        },
+    }
+
+
+def grabaciones_del_curso(curso, cantidad):
+    """Grabaciones deterministas de un curso (la misma semilla da siempre las mismas)."""
+    rng = random.Random(curso)
+    grabaciones = []
+    for i in range(cantidad):
+        inicio = FECHA_BASE + timedelta(days=7 * i, minutes=rng.randint(0, 120))
+        grabaciones.append({
+            'id': f"{curso}-{i}",
+            'mediaName': f"Sesión {i + 1} - {curso}",
+            'startTime': inicio.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            'duration': rng.randint(45, 180) * 60000,
+            'guestLink': f"https://us.bbcollab.com/guest/{curso}-{i}",
+        })
+    return grabaciones
+
+
+class ManejadorFalso(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive, igual que el servidor real
+    config = None # lo asigna iniciar_servidor()
+
+    def log_message(self, *args):
+        pass # sin una línea por petición en la consola
+
+    def responder(self, codigo, cuerpo=b"", tipo="application/json", cabeceras=None):
+        self.send_response(codigo)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for nombre, valor in (cabeceras or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def json(self, datos, codigo=200):
+        self.responder(codigo, json.dumps(datos).encode('utf-8'))
+
+    def simular_red(self):
+        """Aplica el límite de peticiones/s (429), la latencia y los 503 al azar."""
+        c = self.config
+        if c['limite'] and not self.dentro_del_limite():
+            self.responder(429, b'{"error": "demasiadas peticiones (simulado)"}', cabeceras={"Retry-After": "1"})
+            return False
+        if c['latencia'] > 0:
+            time.sleep(max(0.0, random.gauss(c['latencia'], c['latencia'] * 0.2)) / 1000)
+        if c['error'] > 0 and random.random() < c['error']:
+            self.responder(503, b'{"error": "servicio no disponible (simulado)"}')
+            return False
+        return True
+
+    def dentro_del_limite(self):
+        """Ventana fija de 1 s compartida por todos los hilos del servidor."""
+        c = self.config
+        with c['candado']:
+            segundo = int(time.monotonic())
+            if segundo != c['segundo']:
+                c['segundo'], c['en_segundo'] = segundo, 0
+            c['en_segundo'] += 1
+            return c['en_segundo'] <= c['limite']
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if not self.simular_red():
+            return
+
+        if url.path.startswith("/learn/api/v1/users/") and url.path.endswith("/memberships"):
+            total = self.config['cursos']
+            offset = int(params.get('offset', 0))
+            limite = int(params.get('limit', total))
+            fin = min(total, offset + limite)
+            datos = {'results': [curso_de_membresia(n) for n in range(offset, fin)]}
+            if params.get('includeCount') == 'true':
+                datos['paging'] = {'count': total}
+            if fin < total:
+                datos.setdefault('paging', {})['nextPage'] = f"{url.path}?offset={fin}&limit={limite}"
+            return self.json(datos)
+
+        if url.path == "/learn/api/public/v1/users/me":
+            if not self.headers.get("Cookie"):
+                return self.json({'error': 'sin sesión'}, 401)
+            return self.json({'id': '_1_1', 'userName': 'falso'})
+
+        if url.path == "/learn/api/public/v3/courses":
+            # Igual que la API real: courseId busca los cursos cuyo courseId contiene el texto
+            texto = params.get('courseId', '')
+            cursos = [curso_de_membresia(n)['course'] for n in range(self.config['cursos'])]
+            return self.json({'results': [{'id': c['id'], 'courseId': c['courseId'], 'name': c['displayName']}
+                                          for c in cursos if texto in c['courseId']]})
+
+        if url.path == "/webapps/collab-ultra/tool/collabultra/lti/launch":
+            curso = params.get('course_id', '')
+            html = (f'<html><body onload="document.forms[0].submit()">'
+                    f'<form method="post" action="/lti"><input type="hidden" name="context_id" value="{curso}">'
+                    f'<input type="hidden" name="oauth_nonce" value="{random.random()}"></form></body></html>')
+            return self.responder(200, html.encode('utf-8'), tipo="text/html")
+
+        if url.path == "/collab/api/csa/recordings":
+            autorizacion = self.headers.get("Authorization", "")
+            if not autorizacion.startswith("Bearer falso-"):
+                return self.json({'error': 'token inválido'}, 401)
+            curso = autorizacion[len("Bearer falso-"):]
+            todas = [g for g in grabaciones_del_curso(curso, self.config['grabaciones'])
+                     if g['startTime'] >= params.get('startTime', '')]
+            offset = int(params.get('offset', 0))
+            limite = int(params.get('limit', 1000))
+            return self.json({'results': todas[offset:offset + limite], 'size': len(todas)})
+
+        self.json({'error': 'ruta desconocida'}, 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        largo = int(self.headers.get("Content-Length", 0))
+        campos = {k: v[0] for k, v in parse_qs(self.rfile.read(largo).decode('utf-8')).items()}
+        if not self.simular_red():
+            return
+        if url.path == "/lti":
+            # Collaborate redirige a su página con el token en la query
+            destino = f"/collab/ultra/?token=falso-{campos.get('context_id', '')}"
+            return self.responder(302, cabeceras={"Location": destino})
+        self.json({'error': 'ruta desconocida'}, 404)
+
+
+def iniciar_servidor(puerto=0, cursos=200, grabaciones=12, latencia=50, error=0.0, limite=0):
+    """Levanta el servidor en un hilo. Devuelve (servidor, url_base); se detiene con servidor.shutdown().
+
+    latencia en milisegundos por petición; error = fracción de peticiones que responden 503;
+    limite = peticiones por segundo antes de responder 429 (0 = sin límite).
+    """
+    config = {'cursos': cursos, 'grabaciones': grabaciones, 'latencia': latencia, 'error': error,
+              'limite': limite, 'candado': threading.Lock(), 'segundo': 0, 'en_segundo': 0}
+    manejador = type('ManejadorConfigurado', (ManejadorFalso,), {'config': config})
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor falso de Blackboard/Collaborate para pruebas de rendimiento")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--cursos", type=int, default=200, help="Cursos que devuelve /memberships")
+    parser.add_argument("--grabaciones", type=int, default=12, help="Grabaciones por curso")
+    parser.add_argument("--latencia", type=float, default=50, help="Latencia media por petición (ms)")
+    parser.add_argument("--error", type=float, default=0.0, help="Fracción de peticiones que fallan con 503 (0-1)")
+    parser.add_argument("--limite", type=int, default=0, help="Peticiones/s antes de responder 429 (0 = sin límite)")
+    args = parser.parse_args()
+
+    servidor, url = iniciar_servidor(args.puerto, args.cursos, args.grabaciones, args.latencia, args.error, args.limite)
+    print(f"🧪 Servidor falso escuchando en {url} (Ctrl+C para detener)")
+    print(f"👉 BB_BASE_URL={url}  COLLAB_BASE_URL={url}  BB_COOKIES=falsa=1")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
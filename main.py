@@ -1,43 +1,198 @@
-import subprocess
 import os
 import sys
+import time
+import argparse
+import importlib
+from concurrent.futures import ThreadPoolExecutor
 
-# Definimos las rutas relativas a los scripts
-SCRIPT_ETL = os.path.join("src", "01_etl_programacion.py")
-SCRIPT_BOT = os.path.join("src", "03_bot_scraper.py")
-
-print("=================================================")
-print("🚀 INICIANDO SISTEMA DE AUTOMATIZACIÓN UPN")
-print("=================================================")
-
-# ---------------------------------------------------------
-# PASO 1: EJECUTAR ETL (Limpieza y Preparación)
-# ---------------------------------------------------------
-print("\n[1/2] 🧠 Ejecutando ETL (Limpieza de Programación)...")
-try:
-    # subprocess.run ejecuta el script como si lo escribieras en la terminal
-    # check=True lanza un error si el script falla
-    subprocess.run([sys.executable, SCRIPT_ETL], check=True)
-    print("✅ ETL completado con éxito.")
-except subprocess.CalledProcessError:
-    print("\n❌ ERROR CRÍTICO: El proceso de ETL falló.")
-    print("   El robot NO se iniciará para evitar errores.")
-    input("Presiona ENTER para salir...")
-    sys.exit()
-
-# ---------------------------------------------------------
-# PASO 2: EJECUTAR ROBOT (Scraping)
-# ---------------------------------------------------------
-print("\n[2/2] 🤖 Ejecutando Robot (Descarga de Videos)...")
-try:
-    subprocess.run([sys.executable, SCRIPT_BOT], check=True)
-    print("\n✅ Robot finalizado con éxito.")
-except subprocess.CalledProcessError:
-    print("\n❌ ERROR: El Robot se detuvo inesperadamente.")
-    # No salimos con exit() aquí para dejar ver el mensaje final
-
-print("\n=================================================")
-print("✨ PROCESO TOTAL FINALIZADO ✨")
-print("   Revisa la carpeta '02_outputs'")
-print("=================================================")
-input("Presiona ENTER para cerrar esta ventana...")
\ No newline at end of file
+# ==========================================
+# ORQUESTADOR EN UN SOLO PROCESO
+# ==========================================
+# Las etapas se importan y se llaman como funciones (sin subprocess): se ahorra volver
+# a arrancar Python e importar pandas en cada script, y los DataFrames pasan en memoria.
+#
+#   mapa (02) ──┐
+#               ├──> fusión (01) ──> robot (03) ──> conciliación (04)
+#   panel (01) ─┘
+#
+# El mapa de llaves y la lectura del panel no dependen entre sí: corren en paralelo.
+# Una etapa se salta si sus salidas están al día respecto de sus entradas (estilo make).
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "src"))
+
+etl = importlib.import_module("01_etl_programacion")
+from telemetria import abrir_telemetria # noqa: E402
+from almacen_mapa import abrir_mapa, ultima_actualizacion # noqa: E402
+
+# El mapa de llaves cambia poco (cursos nuevos): se refresca si el último refresco tiene más
+# de un día. Los cursos que falten entre refrescos los busca la fusión uno por uno.
+EDAD_MAXIMA_MAPA = 24 * 60 * 60
+ARCHIVO_ALMACEN_MAPA = os.path.join(BASE_DIR, "01_data", "mapa_llaves.db")
+
+telemetria = None # tramos de las etapas (la abre main())
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Sistema de automatización UPN (ETL + Robot)")
+    parser.add_argument("--forzar", action="store_true", help="Correr todas las etapas aunque sus salidas estén al día")
+    parser.add_argument("--soporte", nargs="+", help="Procesar solo estos supervisores (por defecto: todos)")
+    parser.add_argument("--sin-excel", action="store_true", help="No generar las vistas .xlsx intermedias (solo Parquet)")
+    # El resto de opciones (--modo-api, --hilos, --navegadores, --resume...) se pasan al robot
+    return parser
+
+
+def mtime(ruta):
+    return os.path.getmtime(ruta) if os.path.exists(ruta) else None
+
+
+def al_dia(salida, *entradas):
+    """True si 'salida' existe y es más nueva que todas las 'entradas' existentes."""
+    t_salida = mtime(salida)
+    if t_salida is None:
+        return False
+    return all(t is None or t <= t_salida for t in map(mtime, entradas))
+
+
+def cronometrar(tiempos, etapa, funcion, *args, **kwargs):
+    inicio = time.perf_counter()
+    try:
+        return funcion(*args, **kwargs)
+    finally:
+        tiempos[etapa] = time.perf_counter() - inicio
+        telemetria.registrar(etapa, tiempos[etapa])
+
+
+def edad_del_mapa():
+    """Segundos desde el último refresco completo del mapa de llaves (infinito si nunca se hizo)."""
+    if not os.path.exists(ARCHIVO_ALMACEN_MAPA):
+        return float('inf')
+    con = abrir_mapa(ARCHIVO_ALMACEN_MAPA)
+    try:
+        ultima = ultima_actualizacion(con)
+    finally:
+        con.close()
+    return time.time() - ultima.timestamp() if ultima else float('inf')
+
+
+def reportar_tiempos(tiempos, total):
+    print("\n⏱️ Tiempo por etapa (reloj):")
+    for etapa, segundos in tiempos.items():
+        print(f"   {etapa:<12} {segundos:>8.1f} s")
+    print(f"   {'TOTAL':<12} {total:>8.1f} s  (mapa y panel corren en paralelo)")
+
+
+def main():
+    global telemetria
+    args, args_bot = crear_parser().parse_known_args()
+    args_etl = (["--soporte", *args.soporte] if args.soporte else []) + (["--sin-excel"] if args.sin_excel else [])
+    if args.soporte:
+        args_bot += ["--soporte", *args.soporte]
+
+    print("=================================================")
+    print("🚀 INICIANDO SISTEMA DE AUTOMATIZACIÓN UPN")
+    print("=================================================")
+
+    tiempos = {}
+    inicio_total = time.perf_counter()
+    # Tramos de las etapas y de los pasos del ETL -> 02_outputs/telemetria.jsonl (el robot abre los suyos)
+    telemetria = abrir_telemetria('main')
+    etl.telemetria = abrir_telemetria('etl')
+
+    # ---------------------------------------------------------
+    # PASO 1: MAPA DE LLAVES (02) + PANEL (01) EN PARALELO
+    # ---------------------------------------------------------
+    edad_mapa = edad_del_mapa()
+    correr_mapa = args.forzar or edad_mapa > EDAD_MAXIMA_MAPA or not os.path.exists(etl.FILE_MAPA_IDS_PARQUET)
+    # Las salidas solo sirven si se generaron con las mismas opciones (--soporte, --sin-excel)
+    etapa_etl = etl.crear_parser().parse_args(args_etl)
+    opciones = etl.opciones_etapa(etapa_etl)
+    correr_panel = args.forzar or etl.leer_opciones('panel') != opciones \
+        or not al_dia(etl.PARQUET_SUPERVISAR, etl.RUTA_ORIGEN_ONEDRIVE)
+
+    print("\n[1/4] 🗺️ Mapa de llaves + 🧠 ETL del panel...")
+    if not correr_mapa:
+        print(f"⏭️ Mapa de llaves al día ({edad_mapa / 3600:.1f} h): se reutiliza base_maestra_ids.parquet.")
+    if not correr_panel:
+        print("⏭️ supervisar_clases.parquet está al día con el panel: se omite la lectura.")
+
+    df_mapa, df_operativa = None, None
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futuro_mapa = None
+        if correr_mapa:
+            mapa = importlib.import_module("02_mapa_llaves")
+            futuro_mapa = pool.submit(cronometrar, tiempos, 'mapa', mapa.ejecutar, ["--sin-excel"] if args.sin_excel else [])
+        if correr_panel:
+            try:
+                df_operativa = cronometrar(tiempos, 'panel', etl.preparar_panel, etapa_etl)
+            except Exception as e:
+                print(f"❌ Error Crítico: {e}")
+        if futuro_mapa is not None:
+            df_mapa = futuro_mapa.result()
+            if df_mapa is None:
+                print("⚠️ El mapa de llaves no se pudo regenerar: se usará el de la corrida anterior.")
+    # Se sale fuera del bloque del pool: el hilo del mapa ya terminó (p. ej. su login manual)
+    if correr_panel and df_operativa is None:
+        print("\n❌ ERROR CRÍTICO: El proceso de ETL falló.")
+        print("   El robot NO se iniciará para evitar errores.")
+        input("Presiona ENTER para salir...")
+        sys.exit()
+
+    # ---------------------------------------------------------
+    # PASO 2: FUSIÓN CON EL MAPA (01)
+    # ---------------------------------------------------------
+    print("\n[2/4] 🔗 Fusionando cursos activos con el mapa de llaves...")
+    df_final_bot = None
+    if not args.forzar and df_operativa is None and df_mapa is None and etl.leer_opciones('fusion') == opciones \
+            and al_dia(etl.PARQUET_RESUMEN_LLAVE, etl.PARQUET_SUPERVISAR, etl.FILE_MAPA_IDS_PARQUET):
+        print("⏭️ resumen_con_llave.parquet está al día: el robot lo leerá directamente.")
+    else:
+        try:
+            df_final_bot = cronometrar(tiempos, 'fusión', etl.fusionar_con_mapa, etapa_etl, df_operativa, df_mapa)
+        except Exception as e:
+            print(f"❌ Error Crítico: {e}")
+        if df_final_bot is None:
+            print("\n❌ ERROR CRÍTICO: El proceso de ETL falló.")
+            print("   El robot NO se iniciará para evitar errores.")
+            input("Presiona ENTER para salir...")
+            sys.exit()
+        print("✅ ETL completado con éxito.")
+    etl.telemetria.resumen()
+    etl.telemetria.cerrar()
+
+    # ---------------------------------------------------------
+    # PASO 3: ROBOT (03) - siempre corre: las grabaciones cambian a diario
+    # ---------------------------------------------------------
+    print("\n[3/4] 🤖 Ejecutando Robot (Descarga de Videos)...")
+    try:
+        bot = importlib.import_module("03_bot_scraper")
+        cronometrar(tiempos, 'robot', bot.ejecutar, args_bot, df_final_bot)
+        print("\n✅ Robot finalizado con éxito.")
+    except Exception as e:
+        print(f"\n❌ ERROR: El Robot se detuvo inesperadamente: {e}")
+        # No salimos con exit() aquí para dejar ver el mensaje final
+
+    # ---------------------------------------------------------
+    # PASO 4: CONCILIACIÓN (04) - agenda vs grabaciones del almacén
+    # ---------------------------------------------------------
+    print("\n[4/4] 🔗 Conciliando sesiones programadas con grabaciones...")
+    try:
+        conciliacion = importlib.import_module("04_conciliacion")
+        args_conciliacion = ["--soporte", *args.soporte] if args.soporte else []
+        cronometrar(tiempos, 'conciliación', conciliacion.ejecutar, args_conciliacion, df_operativa)
+    except Exception as e:
+        print(f"\n❌ ERROR: La conciliación falló: {e}")
+
+    telemetria.registrar('total', time.perf_counter() - inicio_total)
+    telemetria.cerrar()
+    reportar_tiempos(tiempos, time.perf_counter() - inicio_total)
+
+    print("\n=================================================")
+    print("✨ PROCESO TOTAL FINALIZADO ✨")
+    print("   Revisa la carpeta '02_outputs'")
+    print("=================================================")
+    input("Presiona ENTER para cerrar esta ventana...")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,15 @@
 import pandas as pd
 import os
+import json
 import shutil
 import time
+import argparse
+import importlib
+from intercambio import guardar_tabla, leer_tabla
+from agregaciones_etl import estado_por_curso, auditar_alertas
+from telemetria import Telemetria, abrir_telemetria
+from exportacion import LibroExcel
+from carga_panel import revisar_cambios, leer_columnas, cargar_cache as cargar_cache_panel, guardar_cache as guardar_cache_panel
 
 # ==========================================
 # 1. CONFIGURACIÓN DE RUTAS
@@ -9,6 +17,7 @@ import time
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 FILE_MAPA_IDS = os.path.join(BASE_DIR, "01_data", "base_maestra_ids.xlsx")
+FILE_MAPA_IDS_PARQUET = os.path.join(BASE_DIR, "01_data", "base_maestra_ids.parquet")
 DIR_INPUTS = os.path.join(BASE_DIR, "00_inputs")
 DIR_DATA = os.path.join(BASE_DIR, "01_data")
 DIR_OUTPUTS = os.path.join(BASE_DIR, "02_outputs")
@@ -17,157 +26,313 @@ NOMBRE_ARCHIVO_PROG = "PANEL DE PROGRAMACIÓN V7.xlsx"
 RUTA_ORIGEN_ONEDRIVE = fr"C:\Users\Diego AB\OneDrive - EduCorpPERU\POSGRADO-EPEC - Panel de Control Integrado\{NOMBRE_ARCHIVO_PROG}"
 RUTA_TRABAJO_LOCAL = os.path.join(DIR_INPUTS, NOMBRE_ARCHIVO_PROG)
 
+# Lectura anterior del panel (solo columnas de interés) + firma para detectar cambios
+CACHE_PANEL = os.path.join(DIR_INPUTS, "panel_columnas.pkl")
+FIRMA_PANEL = os.path.join(DIR_INPUTS, "panel_firma.json")
+
 ARCHIVO_SUPERVISAR = os.path.join(DIR_DATA, "supervisar_clases.xlsx")
 ARCHIVO_RESUMEN_LLAVE = os.path.join(DIR_DATA, "resumen_con_llave.xlsx")
 ARCHIVO_ALERTAS = os.path.join(DIR_OUTPUTS, "reporte_alertas.xlsx")
 
-print("--- 🧠 ETL: LIMPIEZA + GENERACIÓN DE REPORTES (CON FILTRO DE ACTIVOS) ---")
+# Intercambio entre scripts en Parquet (los .xlsx de arriba son solo vistas para personas)
+PARQUET_SUPERVISAR = os.path.join(DIR_DATA, "supervisar_clases.parquet")
+PARQUET_RESUMEN_LLAVE = os.path.join(DIR_DATA, "resumen_con_llave.parquet")
+# Opciones con las que se generó cada etapa (main.py solo la reutiliza si coinciden con las de ahora)
+ARCHIVO_OPCIONES = os.path.join(DIR_DATA, "opciones_etl.json")
+
+# Tramos de cada paso del ETL (ejecutar() o main.py los mandan a 02_outputs/telemetria.jsonl)
+telemetria = Telemetria('etl')
+
+COLUMNAS_INTERES = ['SOPORTE', 'CURSO', 'PERIODO', 'NRC', 'DOCENTE', 'SESIÓN', 'FECHAS', 'Hora inicio', 'ESTADO DE CLASE']
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="ETL del Panel de Programación")
+    parser.add_argument("--soporte", nargs="+", help="Procesar solo estos supervisores (por defecto: todos los del panel)")
+    parser.add_argument("--sin-excel", action="store_true", help="No generar supervisar_clases.xlsx ni resumen_con_llave.xlsx (solo Parquet)")
+    parser.add_argument("--sin-buscar", action="store_true", help="No buscar en Blackboard los cursos activos que faltan en el mapa de llaves")
+    return parser
+
+def opciones_etapa(args):
+    """Opciones que cambian las salidas del ETL (Parquet y vistas .xlsx por supervisor)."""
+    return {
+        'soporte': sorted(x.upper() for x in args.soporte) if args.soporte else None,
+        'sin_excel': bool(args.sin_excel),
+        'sin_buscar': bool(args.sin_buscar),
+    }
+
+def leer_opciones(etapa):
+    """Opciones de la última corrida de la etapa ('panel' o 'fusion'), o None si no se registraron."""
+    try:
+        with open(ARCHIVO_OPCIONES, 'r', encoding='utf-8') as f:
+            return json.load(f).get(etapa)
+    except (OSError, ValueError):
+        return None
+
+def guardar_opciones(etapa, args):
+    try:
+        with open(ARCHIVO_OPCIONES, 'r', encoding='utf-8') as f:
+            opciones = json.load(f)
+    except (OSError, ValueError):
+        opciones = {}
+    opciones[etapa] = opciones_etapa(args)
+    with open(ARCHIVO_OPCIONES, 'w', encoding='utf-8') as f:
+        json.dump(opciones, f, indent=2)
 
 # ==========================================
-# 2. COPIA DE SEGURIDAD
+# FUNCIONES DE EXPORTACIÓN (UN ARCHIVO POR SUPERVISOR)
 # ==========================================
-print(f"\n>>> Paso 1: Copiando '{NOMBRE_ARCHIVO_PROG}'...")
-if os.path.exists(RUTA_ORIGEN_ONEDRIVE):
+def ruta_por_soporte(ruta, soporte):
+    """supervisar_clases.xlsx -> supervisar_clases_DIEGO.xlsx"""
+    base, extension = os.path.splitext(ruta)
+    return f"{base}_{str(soporte).replace(' ', '_')}{extension}"
+
+def exportar_supervisar(ruta, df_operativa, df_resumen):
+    # Libro en memoria constante: las fechas se ven como dd/mm/yyyy (formato por defecto del libro)
+    with LibroExcel(ruta) as libro: # with se encarga de abrir el archiv y cuando finaliza se asegura de guardad y cerrar
+        f_text = libro.formato({'num_format': '@', 'align': 'center', 'valign': 'vcenter'})
+        f_center = libro.formato({'align': 'center', 'valign': 'vcenter'})
+
+        # Formatear Operativo
+        t_operativa = libro.agregar_tabla('operativo', df_operativa.columns, len(df_operativa), 'TablaOperativa')
+        ws_operativa = t_operativa.hoja
+        max_c = len(df_operativa.columns)
+        ws_operativa.set_column(0, max_c - 1, 15, f_center)
+        ws_operativa.set_column('F:F', 18, f_text)
+        ws_operativa.set_column('B:C', 30)
+
+        # Formatear Resumen
+        t_resumen = libro.agregar_tabla('resumen', df_resumen.columns, len(df_resumen), 'TablaResumen')
+        ws_resumen = t_resumen.hoja
+        max_cr = len(df_resumen.columns)
+        ws_resumen.set_column(0, max_cr - 1, 15, f_center)
+        ws_resumen.set_column('B:C', 30)
+        ws_resumen.set_column('D:D', 18) 
+
+        # Las filas van después de los formatos de columna (la hoja se escribe fila por fila)
+        t_operativa.escribir_df(df_operativa)
+        t_resumen.escribir_df(df_resumen)
+
+def exportar_alertas(ruta, df_alertas):
+    with LibroExcel(ruta) as libro:
+        hoja = libro.agregar_tabla('Alertas', df_alertas.columns)
+        worksheet = hoja.hoja
+        f_wrap = libro.formato({'text_wrap': True, 'valign': 'top'})
+        worksheet.set_column('A:A', 20, f_wrap); worksheet.set_column('B:B', 25, f_wrap); worksheet.set_column('C:C', 60, f_wrap); worksheet.set_column('D:D', 35, f_wrap)
+        hoja.escribir_df(df_alertas)
+
+# ==========================================
+# 2. COPIA DE SEGURIDAD (SOLO SI EL PANEL CAMBIÓ)
+# ==========================================
+def leer_panel():
+    """Devuelve las columnas de interés del panel (reutiliza la lectura anterior si no cambió)."""
+    print(f"\n>>> Paso 1: Revisando cambios en '{NOMBRE_ARCHIVO_PROG}'...")
+    if not os.path.exists(RUTA_ORIGEN_ONEDRIVE):
+        print(f"❌ NO SE ENCONTRÓ EL ARCHIVO EN ONEDRIVE:\n{RUTA_ORIGEN_ONEDRIVE}")
+        return None
+
+    # Si tamaño, fecha y hash coinciden con la última corrida, no se copia ni se vuelve a leer el Excel
+    sin_cambios, firma_panel = revisar_cambios(RUTA_ORIGEN_ONEDRIVE, FIRMA_PANEL)
+    if sin_cambios and os.path.exists(CACHE_PANEL):
+        print("♻️ El panel no cambió desde la última corrida: se reutiliza la lectura anterior.")
+        return cargar_cache_panel(CACHE_PANEL)
+
+    ruta_lectura = RUTA_TRABAJO_LOCAL
     try:
         shutil.copy2(RUTA_ORIGEN_ONEDRIVE, RUTA_TRABAJO_LOCAL) # copy2 actua sobre los metadatos
         print("✅ Copia exitosa.")
     except PermissionError:
         print("⚠️ Archivo en uso. Intentando lectura directa del original...")
-        RUTA_TRABAJO_LOCAL = RUTA_ORIGEN_ONEDRIVE # fallback
-else:
-    print(f"❌ NO SE ENCONTRÓ EL ARCHIVO EN ONEDRIVE:\n{RUTA_ORIGEN_ONEDRIVE}")
-    exit()
+        ruta_lectura = RUTA_ORIGEN_ONEDRIVE # fallback
+
+    # Lectura por streaming: solo las columnas de interés (encabezado en la fila 2)
+    df_total = leer_columnas(ruta_lectura, 'PROGRAMACIÓN', 2, COLUMNAS_INTERES)
+    guardar_cache_panel(df_total, firma_panel, RUTA_ORIGEN_ONEDRIVE, CACHE_PANEL, FIRMA_PANEL)
+    return df_total
 
 # ==========================================
 # 3. LÓGICA DE PROCESAMIENTO
 # ==========================================
-print("\n>>> Paso 2: Ejecutando lógica de limpieza...")
+def resumir_cursos(df):
+    """Una fila por curso y supervisor con su total de sesiones."""
+    return df.groupby(['SOPORTE', 'ID', 'CURSO', 'DOCENTE', 'ESTADO_CURSO']).size().reset_index(name='Total Sesiones') # size es un contador
+
+def preparar_panel(args):
+    """Etapa 'panel': limpieza, agendas por supervisor y alertas. Devuelve df_operativa (o None).
 
-try:
-    df_total = pd.read_excel(RUTA_TRABAJO_LOCAL, sheet_name='PROGRAMACIÓN', header=1, engine='openpyxl')
+    No depende del mapa de llaves, así que main.py la corre en paralelo con 02_mapa_llaves.
+    """
+    with telemetria.tramo('leer_panel') as t:
+        df_total = leer_panel()
+        t['filas'] = 0 if df_total is None else len(df_total)
+    if df_total is None:
+        return None
 
-    columnas_interes = ['SOPORTE', 'CURSO', 'PERIODO', 'NRC', 'DOCENTE', 'SESIÓN', 'FECHAS', 'Hora inicio', 'ESTADO DE CLASE']
-    cols_existentes = [c for c in columnas_interes if c in df_total.columns] # filtro de seguridad para q no se rompa por si se cambia el nombre de una columna
+    print("\n>>> Paso 2: Ejecutando lógica de limpieza...")
+    cols_existentes = [c for c in COLUMNAS_INTERES if c in df_total.columns] # filtro de seguridad para q no se rompa por si se cambia el nombre de una columna
     df_seguimiento = df_total[cols_existentes].copy()
 
     if 'PERIODO' in df_seguimiento.columns and 'NRC' in df_seguimiento.columns:
         df_seguimiento['ID'] = df_seguimiento['PERIODO'].astype(str) + '.' + df_seguimiento['NRC'].astype(str)
 
     if 'SOPORTE' in df_seguimiento.columns:
-        df_diego = df_seguimiento[df_seguimiento['SOPORTE'].str.strip() == 'DIEGO'].copy()
+        # Un solo parseo del panel para todo el equipo: se conservan todos los supervisores
+        df_seguimiento['SOPORTE'] = df_seguimiento['SOPORTE'].str.strip()
+        df_panel = df_seguimiento[df_seguimiento['SOPORTE'].notna() & (df_seguimiento['SOPORTE'] != '')].copy()
+        if args.soporte:
+            df_panel = df_panel[df_panel['SOPORTE'].str.upper().isin([x.upper() for x in args.soporte])].copy()
     else:
         print("⚠️ Advertencia: Columna SOPORTE no encontrada.")
-        exit()
-
-    if not df_diego.empty:
-        df_diego[['HORA_INI_STR', 'HORA_FIN_STR']] = df_diego['Hora inicio'].str.split(' - ', expand=True) # expand=True crea dos columnas
-        df_diego['HORA_INICIO'] = pd.to_datetime(df_diego['HORA_INI_STR'], format='%I:%M %p', errors='coerce').dt.time
-        df_diego['HORA_FIN'] = pd.to_datetime(df_diego['HORA_FIN_STR'], format='%I:%M %p', errors='coerce').dt.time
-        df_diego['FECHAS'] = pd.to_datetime(df_diego['FECHAS'], errors='coerce')
-        df_diego = df_diego.drop(columns=['HORA_INI_STR', 'HORA_FIN_STR', 'Hora inicio'])
-
-        # --- DETERMINAR ESTADO DEL CURSO (Filtro inteligente) ---
-        # Si tiene celdas vacías en 'ESTADO DE CLASE' -> significa que el curso está ACTIVO
-        # Si todo está lleno -> el curso ha FINALIZADe
-        df_estados = df_diego.groupby('ID')['ESTADO DE CLASE'].apply( #la función lambda afecta a 'ESTADO DE CLASE' 
-            lambda x: 'ACTIVO' if x.isna().any() else 'FINALIZADO' # x.isna() busca celdas vacías y .any() pregunta: "¿Hay al menos una vacía?".
-        ).reset_index(name='ESTADO_CURSO')
-        
-        df_diego = pd.merge(df_diego, df_estados, on='ID', how='left')
-
-        # -----------------------
-        # PREPARACIÓN DE VISTAS
-        # -----------------------
-        df_operativa = df_diego.sort_values(by=['FECHAS', 'HORA_INICIO']) # sort_values ordena las filas
-        orden = ['SOPORTE', 'CURSO', 'DOCENTE', 'PERIODO', 'NRC', 'ID', 'SESIÓN', 'FECHAS', 'HORA_INICIO', 'HORA_FIN', 'ESTADO DE CLASE', 'ESTADO_CURSO']
-        orden_final = [c for c in orden if c in df_operativa.columns] # filtro de seguridad por si alguna columna falla
-        df_operativa = df_operativa[orden_final]
-
-        df_resumen = df_diego.groupby(['ID', 'CURSO', 'DOCENTE', 'ESTADO_CURSO']).size().reset_index(name='Total Sesiones') # size es un contador
-
-        # -----------------------
-        # EXPORTACIÓN 1: SUPERVISAR CLASES
-        # -----------------------
-        print(f"   Generando '{ARCHIVO_SUPERVISAR}'...")
-        # instrucción:  cada vez que encuentre una columna de tipo fecha, muestrala en excel como ...
-        with pd.ExcelWriter(ARCHIVO_SUPERVISAR, engine='xlsxwriter', datetime_format='dd/mm/yyyy') as writer: # with se encarga de abrir el archiv y cuando finaliza se asegura de guardad y cerrar
-            df_operativa.to_excel(writer, sheet_name='operativo', index=False)
-            df_resumen.to_excel(writer, sheet_name='resumen', index=False)
-
-            workbook = writer.book
-            ws_operativa = writer.sheets['operativo']
-            ws_resumen = writer.sheets['resumen']
-            
-            f_text = workbook.add_format({'num_format': '@', 'align': 'center', 'valign': 'vcenter'})
-            f_center = workbook.add_format({'align': 'center', 'valign': 'vcenter'})
-
-            # Formatear Operativo
-            (max_f, max_c) = df_operativa.shape
-            ws_operativa.add_table(0, 0, max_f, max_c - 1, {
-                'columns': [{'header': c} for c in df_operativa.columns], 
-                'style': 'TableStyleMedium2', 
-                'name': 'TablaOperativa'
-            })
-            ws_operativa.set_column(0, max_c - 1, 15, f_center)
-            ws_operativa.set_column('F:F', 18, f_text)
-            ws_operativa.set_column('B:C', 30)
-
-            # Formatear Resumen
-            (max_fr, max_cr) = df_resumen.shape
-            ws_resumen.add_table(0, 0, max_fr, max_cr - 1, {
-                'columns': [{'header': c} for c in df_resumen.columns], 
-                'style': 'TableStyleMedium2', 
-                'name': 'TablaResumen'
-            })
-            ws_resumen.set_column(0, max_cr - 1, 15, f_center)
-            ws_resumen.set_column('B:C', 30)
-            ws_resumen.set_column('D:D', 18) 
-        
-        print("✅ supervisar_clases.xlsx creado correctamente.")
+        return None
 
-        # ==========================================
-        # 4. FUSIÓN Y FILTRADO PARA EL BOT
-        # ==========================================
-        print("\n>>> Paso 3: Fusionando y Filtrando para el Bot...")
+    if df_panel.empty:
+        print("⚠️ No se encontraron registros para los supervisores indicados.")
+        return None
+
+    with telemetria.tramo('fechas_horas', filas=len(df_panel)):
+        df_panel[['HORA_INI_STR', 'HORA_FIN_STR']] = df_panel['Hora inicio'].str.split(' - ', expand=True) # expand=True crea dos columnas
+        df_panel['HORA_INICIO'] = pd.to_datetime(df_panel['HORA_INI_STR'], format='%I:%M %p', errors='coerce').dt.time
+        df_panel['HORA_FIN'] = pd.to_datetime(df_panel['HORA_FIN_STR'], format='%I:%M %p', errors='coerce').dt.time
+        df_panel['FECHAS'] = pd.to_datetime(df_panel['FECHAS'], errors='coerce')
+        df_panel = df_panel.drop(columns=['HORA_INI_STR', 'HORA_FIN_STR', 'Hora inicio'])
+
+    # --- DETERMINAR ESTADO DEL CURSO (Filtro inteligente) ---
+    # Si tiene celdas vacías en 'ESTADO DE CLASE' -> significa que el curso está ACTIVO
+    # Si todo está lleno -> el curso ha FINALIZADO
+    # Se calcula por (SOPORTE, ID): cada supervisor ve el estado de sus propias sesiones
+    with telemetria.tramo('estado_curso'):
+        df_estados = estado_por_curso(df_panel, por=['SOPORTE', 'ID']) # agregación vectorizada (sin lambda por grupo)
         
-        if os.path.exists(FILE_MAPA_IDS):
-            df_mapa = pd.read_excel(FILE_MAPA_IDS, sheet_name='Mapa', dtype={'ID': str})
-            df_resumen_activos = df_resumen[df_resumen['ESTADO_CURSO'] == 'ACTIVO'].copy()
-            df_resumen_activos['ID'] = df_resumen_activos['ID'].astype(str)
-            
-            df_final_bot = pd.merge(df_resumen_activos, df_mapa[['ID', 'ID_Interno']], on='ID', how='left')
-            df_final_bot.to_excel(ARCHIVO_RESUMEN_LLAVE, index=False)
-            
-            finalizados_count = len(df_resumen[df_resumen['ESTADO_CURSO'] == 'FINALIZADO'])
-            print(f"✅ Filtro aplicado: {len(df_resumen_activos)} cursos activos enviados al Bot.")
-            print(f"ℹ️ {finalizados_count} cursos finalizados fueron omitidos para mayor velocidad.")
+        df_panel = pd.merge(df_panel, df_estados, on=['SOPORTE', 'ID'], how='left')
+
+    # -----------------------
+    # PREPARACIÓN DE VISTAS
+    # -----------------------
+    df_operativa = df_panel.sort_values(by=['FECHAS', 'HORA_INICIO']) # sort_values ordena las filas
+    orden = ['SOPORTE', 'CURSO', 'DOCENTE', 'PERIODO', 'NRC', 'ID', 'SESIÓN', 'FECHAS', 'HORA_INICIO', 'HORA_FIN', 'ESTADO DE CLASE', 'ESTADO_CURSO']
+    orden_final = [c for c in orden if c in df_operativa.columns] # filtro de seguridad por si alguna columna falla
+    df_operativa = df_operativa[orden_final]
+
+    df_resumen = resumir_cursos(df_panel)
+
+    soportes = sorted(df_panel['SOPORTE'].unique())
+    print(f"👥 Supervisores en el panel: {', '.join(soportes)}")
+
+    # -----------------------
+    # EXPORTACIÓN 1: SUPERVISAR CLASES
+    # -----------------------
+    with telemetria.tramo('parquet_agenda', filas=len(df_operativa)):
+        guardar_tabla(df_operativa, PARQUET_SUPERVISAR, 'supervisar_clases')
+    print(f"✅ supervisar_clases.parquet creado correctamente ({len(soportes)} supervisores).")
+
+    if not args.sin_excel:
+        # Un Excel por supervisor, partiendo las vistas con un solo groupby
+        resumen_por_soporte = dict(tuple(df_resumen.groupby('SOPORTE')))
+        for soporte, df_op_sop in df_operativa.groupby('SOPORTE'):
+            ruta = ruta_por_soporte(ARCHIVO_SUPERVISAR, soporte)
+            print(f"   Generando '{ruta}'...")
+            with telemetria.tramo('excel_agenda', soporte=soporte, filas=len(df_op_sop)):
+                exportar_supervisar(ruta, df_op_sop, resumen_por_soporte[soporte].drop(columns=['SOPORTE']))
+        print("✅ Agendas supervisar_clases_<SOPORTE>.xlsx creadas correctamente.")
+
+    # ==========================================
+    # 4. ALERTAS
+    # ==========================================
+    print("\n>>> Paso 3: Auditando Anomalías (Alertas)...")
+    with telemetria.tramo('alertas') as t:
+        df_alertas = auditar_alertas(df_panel, por=['SOPORTE', 'ID']) # nombres/docentes contradictorios por ID, en una sola pasada
+        t['alertas'] = len(df_alertas)
+
+    for soporte, df_alertas_sop in df_alertas.groupby('SOPORTE'):
+        ruta = ruta_por_soporte(ARCHIVO_ALERTAS, soporte)
+        with telemetria.tramo('excel_alertas', soporte=soporte, filas=len(df_alertas_sop)):
+            exportar_alertas(ruta, df_alertas_sop.drop(columns=['SOPORTE']))
+        print(f"🚨 Alertas de {soporte} generadas en: {ruta}")
+
+    guardar_opciones('panel', args)
+    return df_operativa
+
+# ==========================================
+# 5. FUSIÓN Y FILTRADO PARA EL BOT
+# ==========================================
+def fusionar_con_mapa(args, df_operativa=None, df_mapa=None):
+    """Etapa 'fusión': cursos activos + ID_Interno del mapa. Devuelve df_final_bot (o None).
+
+    Si no recibe los DataFrames en memoria, los lee de los Parquet de la corrida anterior.
+    """
+    print("\n>>> Paso 4: Fusionando y Filtrando para el Bot...")
+    if df_operativa is None:
+        df_operativa = leer_tabla(PARQUET_SUPERVISAR, 'supervisar_clases')
+    df_resumen = resumir_cursos(df_operativa)
+
+    if df_mapa is None:
+        if os.path.exists(FILE_MAPA_IDS_PARQUET):
+            df_mapa = leer_tabla(FILE_MAPA_IDS_PARQUET, 'mapa_ids', columnas=['ID', 'ID_Interno'])
+        elif os.path.exists(FILE_MAPA_IDS):
+            # Mapa antiguo (antes del Parquet): se lee del Excel forzando texto
+            df_mapa = pd.read_excel(FILE_MAPA_IDS, sheet_name='Mapa', dtype={'ID': str, 'ID_Interno': str}).astype({'ID': 'string', 'ID_Interno': 'string'})
         else:
             print("❌ ERROR: No se encontró 'base_maestra_ids.xlsx'.")
+            return None
 
-        # ==========================================
-        # 5. ALERTAS
-        # ==========================================
-        print("\n>>> Paso 4: Auditando Anomalías (Alertas)...")
-        lista_alertas = []
-        for id_val, grupo in df_diego.groupby('ID'):
-            c_unicos = grupo['CURSO'].dropna().unique() # primero elimina celdas vacias, y luego extrae los valores unicos
-            if len(c_unicos) > 1:
-                lista_alertas.append({'ID': id_val, 'Tipo': 'Nombre Contradictorio', 'Detalle': " / ".join(str(x) for x in c_unicos), 'Acción': 'Revisar Panel'})
-            d_unicos = grupo['DOCENTE'].dropna().unique()
-            if len(d_unicos) > 1:
-                lista_alertas.append({'ID': id_val, 'Tipo': 'Múltiples Docentes', 'Detalle': " / ".join(str(x) for x in d_unicos), 'Acción': 'Verificar reemplazo'})
-
-        if lista_alertas:
-            df_alertas = pd.DataFrame(lista_alertas)
-            with pd.ExcelWriter(ARCHIVO_ALERTAS, engine='xlsxwriter') as writer:
-                df_alertas.to_excel(writer, index=False, sheet_name='Alertas')
-                worksheet = writer.sheets['Alertas']
-                f_wrap = writer.book.add_format({'text_wrap': True, 'valign': 'top'})
-                worksheet.set_column('A:A', 20, f_wrap); worksheet.set_column('B:B', 25, f_wrap); worksheet.set_column('C:C', 60, f_wrap); worksheet.set_column('D:D', 35, f_wrap)
-            print(f"🚨 Alertas generadas en: {ARCHIVO_ALERTAS}")
+    df_resumen_activos = df_resumen[df_resumen['ESTADO_CURSO'] == 'ACTIVO'].copy()
+    df_resumen_activos['ID'] = df_resumen_activos['ID'].astype('string')
+    
+    # El Parquet lleva la columna SOPORTE: el bot elige uno o todos los supervisores
+    with telemetria.tramo('fusion', cursos=len(df_resumen_activos)):
+        df_final_bot = pd.merge(df_resumen_activos, df_mapa[['ID', 'ID_Interno']], on='ID', how='left')
+
+    # Cursos activos que no están en el mapa (p. ej. creados después del último refresco):
+    # se buscan solo esos en Blackboard, sin volver a descargar todas las membresías
+    faltantes = df_final_bot.loc[df_final_bot['ID_Interno'].isna(), 'ID'].dropna().unique().tolist()
+    if faltantes and not args.sin_buscar:
+        print(f"🔎 {len(faltantes)} cursos activos sin ID_Interno en el mapa: buscándolos en Blackboard...")
+        try:
+            with telemetria.tramo('buscar_faltantes', cursos=len(faltantes)):
+                mapa = importlib.import_module("02_mapa_llaves")
+                encontrados = mapa.buscar_faltantes(faltantes, args.sin_excel)
+        except Exception as e:
+            # La búsqueda es opcional: los cursos sin llave siguen y el robot los omite
+            print(f"⚠️ No se pudo completar la búsqueda de cursos faltantes: {e}")
+            encontrados = []
+        if len(encontrados):
+            llaves = encontrados.drop_duplicates('ID').set_index('ID')['ID_Interno']
+            df_final_bot['ID_Interno'] = df_final_bot['ID_Interno'].fillna(df_final_bot['ID'].map(llaves))
+
+    guardar_tabla(df_final_bot, PARQUET_RESUMEN_LLAVE, 'resumen_con_llave')
+    if not args.sin_excel:
+        with telemetria.tramo('excel_resumen', filas=len(df_final_bot)):
+            for soporte, df_bot_sop in df_final_bot.groupby('SOPORTE'):
+                # Misma hoja que dejaba to_excel ('Sheet1', sin tabla), escrita en streaming como los demás Excel
+                with LibroExcel(ruta_por_soporte(ARCHIVO_RESUMEN_LLAVE, soporte)) as libro:
+                    libro.agregar_df('Sheet1', df_bot_sop.drop(columns=['SOPORTE']))
+    
+    for soporte, del_soporte in df_resumen.groupby('SOPORTE'):
+        activos = (del_soporte['ESTADO_CURSO'] == 'ACTIVO').sum()
+        print(f"✅ {soporte}: {activos} cursos activos enviados al Bot | {len(del_soporte) - activos} finalizados omitidos.")
+    guardar_opciones('fusion', args)
+    return df_final_bot
+
+# ==========================================
+# 6. EJECUCIÓN
+# ==========================================
+def ejecutar(argv=None, df_mapa=None):
+    """Corre el ETL completo (panel + fusión). Devuelve df_final_bot para el robot (o None)."""
+    global telemetria
+    args = crear_parser().parse_args(argv)
+    print("--- 🧠 ETL: LIMPIEZA + GENERACIÓN DE REPORTES (CON FILTRO DE ACTIVOS) ---")
+    telemetria = abrir_telemetria('etl') # tramos de cada paso -> 02_outputs/telemetria.jsonl
+    try:
+        df_operativa = preparar_panel(args)
+        if df_operativa is None:
+            return None
+        return fusionar_con_mapa(args, df_operativa, df_mapa)
+    except Exception as e:
+        print(f"❌ Error Crítico: {e}")
+        return None
+    finally:
+        telemetria.resumen()
+        telemetria.cerrar()
 
-    else:
-        print("⚠️ No se encontraron registros para 'DIEGO'.")
 
-except Exception as e:
-    print(f"❌ Error Crítico: {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    ejecutar()
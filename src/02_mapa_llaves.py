@@ -1,10 +1,17 @@
 import time
-import requests
+import json
+import argparse
 import pandas as pd
 import os
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service #el motor de chorme arranque correctamente en el sistema operativo
-from webdriver_manager.chrome import ChromeDriverManager
+import requests
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, quote
+from intercambio import guardar_tabla
+from exportacion import LibroExcel
+from sesion_http import URL_BLACKBOARD, crear_sesion, leer_cookies, guardar_cookies
+from navegador import abrir_chrome, iniciar_sesion, cookies_de_sesion, cookies_como_texto
+from almacen_mapa import abrir_mapa, leer_mapa, guardar_cursos, leer_meta, guardar_meta, marcar_actualizacion
 
 # ==========================================
 # 1. CONFIGURACIÓN DE RUTAS
@@ -12,124 +19,252 @@ from webdriver_manager.chrome import ChromeDriverManager
 # Subimos un nivel (..) para salir de 'scr' y entrar a '01_data'
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 ARCHIVO_SALIDA = os.path.join(BASE_DIR, "01_data", "base_maestra_ids.xlsx")
+# Intercambio con el ETL (Parquet con esquema: el ID llega como texto sin forzarlo)
+ARCHIVO_PARQUET = os.path.join(BASE_DIR, "01_data", "base_maestra_ids.parquet")
 
 # ID de Usuario en Blackboard (Extraído de tu URL original: _567444_1)
 # OJO: Si este ID cambia por usuario, avísame para automatizar su extracción también.
 USER_ID_BB = "_567444_1" 
 
-print("--- 🗺️ MAPA DE LLAVES: MODO HÍBRIDO (SELENIUM + API) ---")
+# Mapa completo con llave ID_Interno + hora del último refresco
+ARCHIVO_ALMACEN_MAPA = os.path.join(BASE_DIR, "01_data", "mapa_llaves.db")
+# Cookies de la última sesión (permisos 0600, fuera de git): evitan el login en cada corrida
+ARCHIVO_COOKIES = os.path.join(BASE_DIR, "01_data", "sesion_bb.txt")
 
-# ==========================================
-# 2. OBTENER COOKIE AUTOMÁTICAMENTE (Selenium)
-# ==========================================
-print("\n>>> Paso 1: Iniciando navegador para capturar sesión...")
-options = webdriver.ChromeOptions()
-options.add_argument("--start-maximized")
-options.add_argument('--ignore-certificate-errors')
-
-driver = webdriver.Chrome(
-    service=Service(ChromeDriverManager().install()), # actualiza la versión de chrome correcta para el script
-    options=options
-)
-
-try:
-    # A. Login Manual
-    driver.get("https://upn-colaborador.blackboard.com/")
-    print("🔑 POR FAVOR, INICIA SESIÓN MANUALMENTE...")
-    print("👉 Esperamos a que cargue la página principal de Blackboard.")
-    
-    # B. Esperar a que el usuario presione ENTER (asegurando login completo)
-    input("✅ Una vez dentro (viendo tus cursos), presiona ENTER aquí en la consola...")
-
-    # C. Capturar Cookies del navegador
-    print("🍪 Extrayendo cookies de la sesión...")
-    selenium_cookies = driver.get_cookies()
-    
-    # Formatear cookies para la librería 'requests'
-    # Las unimos en un solo string: "nombre=valor; nombre2=valor2"
-    cookie_string = "; ".join([f"{c['name']}={c['value']}" for c in selenium_cookies])
-
-    # Ya no necesitamos el navegador, cerramos para liberar RAM
-    driver.quit()
+# Membresías del usuario (todos sus cursos) en la API de Blackboard, por páginas
+LIMITE_PAGINA = 200
+RUTA_MEMBRESIAS = "/learn/api/v1/users/{usuario}/memberships?expand=course.effectiveAvailability,course.permissions,courseRole&includeCount=true&limit={limite}"
+# Búsqueda puntual de un curso (courseId 'contiene' el texto): para los IDs que faltan en el mapa
+RUTA_BUSCAR_CURSO = "/learn/api/public/v3/courses?courseId={id}&fields=id,courseId,name"
+TIMEOUT_API = 60
+HILOS_BUSQUEDA = 8
+# Un ID que Blackboard no devolvió no se vuelve a buscar hasta pasado este tiempo
+# (si el curso se crea después, lo trae el refresco completo del mapa)
+ESPERA_NO_ENCONTRADOS = timedelta(days=7)
+
+# --- TU LÓGICA DE LIMPIEZA (ID: 2025.02.225832.1049 -> 225832.1049) ---
+# Tomas la parte 2 y 3 (índices 2 y 3); si el formato es raro, se guarda el original
+PATRON_ID = r'^(?:[^.]*\.){2}([^.]*\.[^.]*)'
+
+def limpiar_ids(ids_visibles):
+    """courseId -> ID en una sola operación vectorizada sobre toda la columna."""
+    return ids_visibles.str.extract(PATRON_ID, expand=False).fillna(ids_visibles)
+
+def armar_mapa(cursos, campo_nombre='displayName'):
+    """Lista de cursos de la API (dicts con id, courseId y nombre) -> mapa ID -> ID_Interno (sin repetidos)."""
+    df = pd.DataFrame(cursos, columns=['id', 'courseId', campo_nombre])
+    id_vis = df['courseId'].fillna('').astype(str)
+    mapa = pd.DataFrame({
+        'ID': limpiar_ids(id_vis),
+        'Nombre': df[campo_nombre],
+        'ID_Interno': df['id'], # La llave maestra (_123_1)
+        'ID_Visible': id_vis,
+    })
+    # Eliminamos duplicados basados en ID_Interno
+    return mapa.drop_duplicates(subset=['ID_Interno'])
+
+def parsear_membresias(data):
+    """Convierte la respuesta JSON de /memberships en el mapa ID -> ID_Interno (sin repetidos)."""
+    # Una membresía sin objeto 'course' no tiene ID_Interno: se omite
+    return armar_mapa([item['course'] for item in data.get('results', []) if item.get('course')])
+
+def iniciar_sesion_navegador():
+    """Sesión desde Chrome (la del perfil guardado o login manual). Devuelve las cookies como texto "nombre=valor; nombre2=valor2"."""
+    print("\n>>> Iniciando navegador para capturar sesión...")
+    driver = abrir_chrome("principal")
+    try:
+        iniciar_sesion(driver)
+
+        # Capturar Cookies del navegador
+        print("🍪 Extrayendo cookies de la sesión...")
+        cookie_string = cookies_como_texto(cookies_de_sesion(driver))
+    finally:
+        # Ya no necesitamos el navegador, cerramos para liberar RAM
+        driver.quit()
     print("✅ Cookies capturadas con éxito. Cerrando navegador.")
+    return cookie_string
 
-    # ==========================================
-    # 3. CONSUMO DE API (Tu lógica original)
-    # ==========================================
-    print("\n>>> Paso 2: Consultando API de Blackboard...")
-    
-    url = f"https://upn.blackboard.com/learn/api/v1/users/{USER_ID_BB}/memberships?expand=course.effectiveAvailability,course.permissions,courseRole&includeCount=true&limit=10000"
-
-    headers = {
-        "Cookie": cookie_string, # Usamos la cookie fresca de Selenium
-        "User-Agent": "Mozilla/5.0", # para que el servidor piense que es un humano
-        "Content-Type": "application/json" #
-    }
-
-    response = requests.get(url, headers=headers)
-    
-    if response.status_code == 200: # código universal
+def descargar_membresias(con, sesion):
+    """Recorre las páginas de /memberships y guarda solo los cursos nuevos o cambiados.
+
+    Devuelve (leídos, nuevos, cambiados) o None si la sesión no sirve (401/403).
+    """
+    url = URL_BLACKBOARD + RUTA_MEMBRESIAS.format(usuario=USER_ID_BB, limite=LIMITE_PAGINA)
+    leidos = nuevos = cambiados = 0
+    pagina, total = 0, None
+    while url:
+        response = sesion.get(url, timeout=TIMEOUT_API)
+        if response.status_code in (401, 403):
+            return None
+        response.raise_for_status()
         data = response.json() # traducción
-        lista_unica = [] # contenedor
-        
-        print(f"   Datos recibidos. Procesando {len(data.get('results', []))} registros...")
-
-        for item in data.get('results', []):
-            info_curso = item.get('course', {})
-            id_vis = str(info_curso.get('courseId', ''))
-            
-            # --- TU LÓGICA DE LIMPIEZA (ID: 2025.02.225832.1049 -> 225832.1049) ---
-            partes = id_vis.split('.')
-            id_limpio = ""
-            if len(partes) >= 4:
-                # Tomas la parte 2 y 3 (índices 2 y 3)
-                id_limpio = f"{partes[2]}.{partes[3]}"
-            else:
-                # Si el formato es raro, guardamos el original por seguridad
-                id_limpio = id_vis
-            
-            lista_unica.append({
-                'ID': str(id_limpio), 
-                'Nombre': info_curso.get('displayName'),
-                'ID_Interno': info_curso.get('id'), # La llave maestra (_123_1)
-                'ID_Visible': id_vis
-            })
-        
-        # Creamos el dataframe y eliminamos duplicados basados en ID_Interno
-        df = pd.DataFrame(lista_unica).drop_duplicates(subset=['ID_Interno'])
-        
-        # ==========================================
-        # 4. EXPORTACIÓN ROBUSTA (XlsxWriter)
-        # ==========================================
-        print(f"\n>>> Paso 3: Guardando Excel en {ARCHIVO_SALIDA}...")
-        
-        writer = pd.ExcelWriter(ARCHIVO_SALIDA, engine='xlsxwriter')
-        df.to_excel(writer, index=False, sheet_name='Mapa')
-        
-        workbook  = writer.book # ingreo a las funciones avanzadas de excel
-        worksheet = writer.sheets['Mapa']
-        
+        df = parsear_membresias(data)
+        n, c = guardar_cursos(con, df)
+        pagina += 1
+        leidos, nuevos, cambiados = leidos + len(df), nuevos + n, cambiados + c
+        total = data.get('paging', {}).get('count', total)
+        print(f"   Página {pagina}: {leidos}{f'/{total}' if total else ''} cursos | {nuevos} nuevos | {cambiados} cambiados")
+        siguiente = data.get('paging', {}).get('nextPage')
+        url = urljoin(URL_BLACKBOARD, siguiente) if siguiente else None
+    return leidos, nuevos, cambiados
+
+def exportar_mapa(df, sin_excel=False):
+    """Parquet (para el ETL) + Excel opcional (para personas) con el mapa completo."""
+    print(f"\n>>> Guardando mapa en {ARCHIVO_PARQUET}...")
+    guardar_tabla(df, ARCHIVO_PARQUET, 'mapa_ids')
+    if sin_excel:
+        return
+    print(f"   Generando vista Excel en {ARCHIVO_SALIDA}...")
+
+    with LibroExcel(ARCHIVO_SALIDA) as libro:
+        tabla = libro.agregar_tabla('Mapa', df.columns, len(df))
+        worksheet = tabla.hoja
+
         # DEFINIMOS EL FORMATO TEXTO (El @ es la clave en Excel)
-        formato_texto = workbook.add_format({'num_format': '@'}) # num_format es una máscara de visualización
-        
-        # Aplicamos el formato y anchos
+        formato_texto = libro.formato({'num_format': '@'}) # num_format es una máscara de visualización
+
+        # Aplicamos el formato y anchos (antes de las filas: la hoja se escribe fila por fila)
         worksheet.set_column('A:A', 20, formato_texto) # Columna ID forzada a Texto
         worksheet.set_column('B:B', 60)                
         worksheet.set_column('C:C', 25)                
         worksheet.set_column('D:D', 40)                
-        
-        writer.close()
-        
+
+        tabla.escribir_df(df)
+
+def ejecutar(argv=None):
+    """Refresca el mapa por páginas (solo guarda cambios) y exporta el Parquet. Devuelve el DataFrame (o None)."""
+    parser = argparse.ArgumentParser(description="Mapa de llaves (ID -> ID_Interno) de Blackboard")
+    parser.add_argument("--sin-excel", action="store_true", help="No generar la vista base_maestra_ids.xlsx (solo el Parquet)")
+    args = parser.parse_args(argv)
+
+    print("--- 🗺️ MAPA DE LLAVES: MODO HÍBRIDO (SELENIUM + API) ---")
+    con = abrir_mapa(ARCHIVO_ALMACEN_MAPA)
+    try:
+        # ==========================================
+        # 2. SESIÓN: COOKIES GUARDADAS O LOGIN MANUAL (Selenium)
+        # ==========================================
+        resultado = None
+        # BB_COOKIES permite saltar el login (p. ej. contra un servidor local de pruebas)
+        cookie_string = os.getenv("BB_COOKIES") or leer_cookies(ARCHIVO_COOKIES)
+        if cookie_string:
+            print("\n>>> Paso 1: Consultando API de Blackboard con la sesión guardada...")
+            resultado = descargar_membresias(con, crear_sesion(cookie_string))
+            if resultado is None:
+                print("⚠️ La sesión guardada ya no es válida: se pide login.")
+        if resultado is None:
+            cookie_string = iniciar_sesion_navegador()
+            guardar_cookies(ARCHIVO_COOKIES, cookie_string)
+            # ==========================================
+            # 3. CONSUMO DE API (Tu lógica original, ahora por páginas)
+            # ==========================================
+            print("\n>>> Paso 2: Consultando API de Blackboard...")
+            resultado = descargar_membresias(con, crear_sesion(cookie_string))
+            if resultado is None:
+                print("❌ Error API: La cookie no funcionó o el UserID es incorrecto.")
+                return None
+        marcar_actualizacion(con)
+        leidos, nuevos, cambiados = resultado
+        df = leer_mapa(con)
+
+        # ==========================================
+        # 4. EXPORTACIÓN: PARQUET (PARA EL ETL) + EXCEL OPCIONAL (PARA PERSONAS)
+        # ==========================================
+        # Sin cambios no se reescribe: el Parquet conserva su fecha y el orquestador puede saltar la fusión
+        if nuevos or cambiados or not os.path.exists(ARCHIVO_PARQUET):
+            exportar_mapa(df, args.sin_excel)
+        else:
+            print("⏭️ Sin cursos nuevos ni cambiados: base_maestra_ids.parquet se mantiene.")
+
         print(f"--------------------------------------------------")
-        print(f"✅ ¡LISTO! Mapa generado exitosamente.")
-        print(f"📂 Archivo: 01_data/base_maestra_ids.xlsx")
+        print(f"✅ ¡LISTO! Mapa actualizado: {leidos} membresías leídas, {nuevos} nuevas, {cambiados} cambiadas ({len(df)} cursos en total).")
+        print(f"📂 Archivo: 01_data/base_maestra_ids.parquet")
         print(f"--------------------------------------------------")
-        
-    else:
-        print(f"❌ Error API {response.status_code}: La cookie no funcionó o el UserID es incorrecto.")
-
-except Exception as e:
-    print(f"❌ Error crítico: {e}")
-    # Aseguramos cerrar driver si falló algo antes
-    try: driver.quit() 
-    except: pass
\ No newline at end of file
+        return df
+
+    except Exception as e:
+        print(f"❌ Error crítico: {e}")
+    finally:
+        con.close()
+    return None
+
+# ==========================================
+# 5. BÚSQUEDA PUNTUAL (IDs QUE FALTAN EN EL MAPA)
+# ==========================================
+def buscar_curso(sesion, id_curso):
+    """Cursos cuyo ID limpio es exactamente id_curso (DataFrame), o None si la sesión no sirve."""
+    response = sesion.get(URL_BLACKBOARD + RUTA_BUSCAR_CURSO.format(id=quote(id_curso)), timeout=TIMEOUT_API)
+    if response.status_code in (401, 403):
+        return None
+    if response.status_code != 200:
+        return armar_mapa([], campo_nombre='name')
+    df = armar_mapa(response.json().get('results', []), campo_nombre='name')
+    # La API busca por "contiene": se descartan los otros cursos que comparten el texto
+    return df[df['ID'] == id_curso]
+
+def leer_no_encontrados(con):
+    """{ID: fecha ISO de la última búsqueda sin resultado} (guardado en la tabla meta)."""
+    try:
+        return json.loads(leer_meta(con, 'no_encontrados') or '{}')
+    except ValueError:
+        return {}
+
+def buscar_faltantes(ids, sin_excel=False):
+    """Busca en Blackboard solo los IDs indicados (sin refresco completo) y los agrega al mapa.
+
+    Usa la sesión guardada por la última corrida de este script (o BB_COOKIES): no abre
+    el navegador. Los IDs buscados sin resultado hace menos de ESPERA_NO_ENCONTRADOS se
+    omiten. Un error de red en un ID no detiene la búsqueda de los demás. Devuelve el
+    DataFrame de los cursos encontrados (puede estar vacío).
+    """
+    con = abrir_mapa(ARCHIVO_ALMACEN_MAPA)
+    try:
+        no_encontrados = leer_no_encontrados(con)
+        limite = (datetime.now() - ESPERA_NO_ENCONTRADOS).isoformat(timespec='seconds')
+        recientes = [i for i in ids if no_encontrados.get(i, '') > limite]
+        ids = [i for i in ids if i not in recientes]
+        if recientes:
+            print(f"⏭️ {len(recientes)} IDs ya se buscaron sin resultado hace menos de {ESPERA_NO_ENCONTRADOS.days} días: se omiten.")
+        if not ids:
+            return armar_mapa([])
+
+        cookie_string = os.getenv("BB_COOKIES") or leer_cookies(ARCHIVO_COOKIES)
+        if not cookie_string:
+            print("⚠️ No hay sesión guardada para buscar los cursos: ejecuta '02_mapa_llaves.py'.")
+            return armar_mapa([])
+        sesion = crear_sesion(cookie_string, conexiones=HILOS_BUSQUEDA)
+        fallidos = set()
+
+        def buscar(id_curso):
+            try:
+                return buscar_curso(sesion, id_curso)
+            except requests.RequestException as e:
+                print(f"   ⚠️ No se pudo buscar el curso {id_curso}: {e}")
+                fallidos.add(id_curso)
+                return armar_mapa([], campo_nombre='name')
+
+        with ThreadPoolExecutor(max_workers=HILOS_BUSQUEDA) as pool:
+            resultados = list(pool.map(buscar, ids))
+        if any(r is None for r in resultados):
+            print("⚠️ La sesión guardada ya no es válida: ejecuta '02_mapa_llaves.py' para volver a iniciar sesión.")
+        encontrados = [r for r in resultados if r is not None and len(r)]
+        df = pd.concat(encontrados, ignore_index=True) if encontrados else armar_mapa([])
+        nuevos, cambiados = guardar_cursos(con, df)
+        if nuevos or cambiados:
+            exportar_mapa(leer_mapa(con), sin_excel)
+
+        # Solo cuentan como "no encontrados" los IDs que Blackboard respondió sin resultados
+        ahora = datetime.now().isoformat(timespec='seconds')
+        for id_curso, r in zip(ids, resultados):
+            if r is not None and not len(r) and id_curso not in fallidos:
+                no_encontrados[id_curso] = ahora
+        vigentes = {i: f for i, f in no_encontrados.items() if f > limite and i not in set(df['ID'])}
+        guardar_meta(con, 'no_encontrados', json.dumps(vigentes))
+
+        print(f"🔎 {df['ID'].nunique()} de {len(ids)} IDs encontrados en Blackboard.")
+        return df
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    ejecutar()
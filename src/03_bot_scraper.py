@@ -1,11 +1,24 @@
 import time
+import argparse
+import threading
+import json
+import queue
 import pandas as pd
 import requests
 import os
 from datetime import datetime
-from seleniumwire import webdriver # captura respuestas de manera sileciosa
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait # pool de hilos para llamar a la API en paralelo
+from almacen_grabaciones import abrir_almacen, obtener_marca, obtener_actualizaciones, guardar_grabaciones, leer_grabaciones, resumen_cursos
+from planificador import planificar
+from sesion_http import URL_BLACKBOARD, URL_COLLAB, crear_sesion, obtener_token_lti
+from intercambio import leer_tabla
+from navegador import abrir_chrome as abrir_chrome_perfil, iniciar_sesion, cookies_de_sesion, cookies_como_texto
+from cache_tokens import cargar_cache, guardar_cache, token_vigente, registrar_token, descartar_token
+from cache_reporte import abrir_cache_reporte, huella, leer_filas, guardar_filas
+from exportacion import LibroExcel
+from telemetria import Telemetria, BarraProgreso, abrir_telemetria
+from cliente_api import ClienteAPI, LimitadorAdaptativo, TASA_INICIAL, ESTADOS_REINTENTABLES
 
 # ==========================================
 # 1. CONFIGURACIÓN DE RUTAS (ADAPTADO A TU ESTRUCTURA)
@@ -14,177 +27,657 @@ from webdriver_manager.chrome import ChromeDriverManager
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # Input: Viene de la carpeta 01_data (donde lo dejó el script anterior)
-ARCHIVO_INPUT = os.path.join(BASE_DIR, "01_data", "resumen_con_llave.xlsx")
+ARCHIVO_INPUT = os.path.join(BASE_DIR, "01_data", "resumen_con_llave.parquet")
+
+# Agenda de sesiones del ETL: decide qué cursos pueden tener grabaciones nuevas
+ARCHIVO_AGENDA = os.path.join(BASE_DIR, "01_data", "supervisar_clases.parquet")
 
 # Output: Va a la carpeta 02_outputs (Reporte Final)
 ARCHIVO_SALIDA = os.path.join(BASE_DIR, "02_outputs", "REPORTE_FINAL_COMPLETO.xlsx")
 
-print("--- 🤖 ROBOT UPN: MODO PRODUCCIÓN (TODOS LOS CURSOS) ---")
+# Caché de tokens Bearer por curso (se reutilizan mientras no venzan)
+ARCHIVO_CACHE_TOKENS = os.path.join(BASE_DIR, "01_data", "cache_tokens.json")
 
-if not os.path.exists(ARCHIVO_INPUT):
-    print(f"❌ Error CRÍTICO: No encuentro el archivo de entrada en:\n{ARCHIVO_INPUT}")
-    print("👉 Ejecuta primero '01_etl_programacion.py'")
-    exit()
+# Caché de las filas del reporte por contenido de cada curso (los cursos sin cambios no se vuelven a parsear)
+ARCHIVO_CACHE_REPORTE = os.path.join(BASE_DIR, "01_data", "cache_reporte.db")
 
-# Leemos forzando que los IDs sean texto (str) para no perder ceros a la izquierda
-df_trabajo = pd.read_excel(ARCHIVO_INPUT, dtype={'ID': str, 'ID_Interno': str})
+# Almacén SQLite con el historial de grabaciones y la marca de agua de cada curso
+ARCHIVO_ALMACEN = os.path.join(BASE_DIR, "01_data", "grabaciones.db")
 
-# --- SIN FRENOS ---
-print(f"📚 Cursos detectados en archivo: {len(df_trabajo)}")
-print("🚀 Iniciando procesamiento masivo...")
+# Checkpoint: una línea JSON por curso terminado (permite --resume)
+ARCHIVO_CHECKPOINT = os.path.join(BASE_DIR, "01_data", "checkpoint_bot.jsonl")
 
-# --- DETECTIVE DE COLUMNAS (Para encontrar el nombre del curso automáticamente) ---
-col_curso = 'ND'
-posibles_nombres = ['Curso', 'Nombre', 'Asignatura', 'Materia', 'Descripción']
-for col in df_trabajo.columns:
-    for posible in posibles_nombres:
-        if posible.lower() in col.lower():
-            col_curso = col
-            break
-    if col_curso != 'ND': break
-print(f"👉 Nombre del curso tomado de columna: '{col_curso}'")
+# Tamaño de página al consultar /recordings (se siguen pidiendo páginas hasta agotar)
+LIMITE_PAGINA = 500
+
+# Tiempo máximo de espera por el token de Collaborate (el bot sigue apenas aparece)
+TIMEOUT_TOKEN = 15
+
+# Límite de llamadas simultáneas a la API de Collaborate (se puede cambiar con --hilos)
+MAX_HILOS_API = 8
+
+# Navegadores Chrome trabajando a la vez (solo el primero requiere login manual)
+NAVEGADORES = 1
+
+# Rondas extra al final de la corrida para los cursos con fallas temporales (429/5xx/conexión)
+RONDAS_FINALES = 2
+
+# El reporte final se arma y se escribe por lotes de filas: la memoria no crece con el total
+LOTE_EXPORTACION = 5000
+COLUMNAS_REPORTE = ['ID', 'Curso', 'Docente', 'Nombre Video', 'Fecha', 'Hora', 'Duración (min)', 'Link']
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Robot de grabaciones Blackboard Collaborate")
+    parser.add_argument("--hilos", type=int, default=MAX_HILOS_API, help="Llamadas simultáneas a la API de Collaborate")
+    parser.add_argument("--tasa", type=float, default=TASA_INICIAL, help="Peticiones/s iniciales a la API (se adapta sola ante 429)")
+    parser.add_argument("--navegadores", type=int, default=NAVEGADORES, help="Navegadores en paralelo (comparten la sesión del primero)")
+    parser.add_argument("--modo-api", action="store_true", help="Usar Chrome solo para el login y obtener los tokens por HTTP (lanzamiento LTI)")
+    parser.add_argument("--soporte", nargs="+", help="Procesar solo los cursos de estos supervisores (por defecto: todos)")
+    parser.add_argument("--resume", action="store_true", help="Omitir los cursos ya completados en la corrida anterior")
+    parser.add_argument("--force-all", action="store_true", help="Visitar todos los cursos activos, aunque no hayan tenido sesión desde la última consulta")
+    parser.add_argument("--csv", action="store_true", help="Escribir también REPORTE_FINAL_COMPLETO.csv con las mismas filas")
+    return parser
+
+# --- ESTADO DE LA CORRIDA ---
+# Lo inicializa ejecutar(); las funciones de abajo (hilos del pool y de los navegadores) lo comparten.
+args = None
+cache = {}
+almacen = None
+marcas = {}
+cliente_api = None # GET con limitador de tasa compartido y reintentos (cliente_api.ClienteAPI)
+total_cursos = 0
+estado_navegador = {'drivers': [], 'stats': {}}
+estado_http = {'cliente': None} # sesión con cookies de Blackboard tras el limitador de la API (solo --modo-api)
+candado = threading.Lock() # los hilos de la API escriben en el almacén, el caché y el checkpoint
+reintentar = [] # cursos cuyo token de caché fue rechazado (401)
+fallidos = [] # (token, curso, token_de_cache) con fallas temporales: se reintentan al final
+telemetria = Telemetria('robot') # tramos por curso (en memoria hasta que ejecutar() abre el archivo)
+barra = None # barra de progreso de la corrida (avanza con cada curso terminado)
 
 # ==========================================
-# 2. INICIAR NAVEGADOR (CON PROXY INTERNO)
+# 2. NAVEGADOR (CON PROXY INTERNO) - SOLO SI HACE FALTA
 # ==========================================
-options = webdriver.ChromeOptions()
-options.add_argument('--ignore-certificate-errors') # le dice a chrome que no se detenga si se encuentra una alerta de red (comun en redes corporativas)
-options.set_capability("acceptInsecureCerts", True)
-options.add_argument("--start-maximized")
+# --- CAPTURA DE TOKEN POR EVENTO ---
+# El interceptor corre dentro del proxy en cuanto sale la petición a /recordings,
+# así no hay que revisar driver.requests cada segundo.
+# Cada navegador tiene su propio estado de captura (driver.captura) porque pueden trabajar varios a la vez.
+def crear_interceptor(captura):
+    def interceptar_token(request):
+        if "recordings" in request.url:
+            auth = request.headers.get('Authorization') # Authorization es la llave maestra
+            if auth and "Bearer" in auth: # Bearer token significa el q tiene la llave tiene permiso
+                captura['valor'] = auth
+                captura['evento'].set()
+    return interceptar_token
+
+def abrir_chrome(numero=1):
+    """Abre un Chrome con selenium-wire listo para capturar tokens (con el perfil persistente del navegador N)."""
+    # Cada navegador abierto a la vez necesita su propio perfil (Chrome bloquea el que está en uso)
+    # request_storage_max_size evita que el proxy acumule peticiones en memoria
+    seleniumwire_options = {'request_storage': 'memory', 'request_storage_max_size': 50}
+    # El primero comparte perfil con 02_mapa_llaves: un solo login sirve para ambos scripts
+    perfil = "principal" if numero == 1 else f"principal_{numero}"
+    driver = abrir_chrome_perfil(perfil, wire=True, seleniumwire_options=seleniumwire_options)
 
-# Iniciamos Chrome con selenium-wire para capturar tokens
-# webdriver.Chrome abre el navegador, service conecta python con el navegador físico
-# ChromeDriverManager().install() chrome se actualiza automaticamente
-driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options) 
+    # Solo se capturan peticiones a Collaborate: el resto de Blackboard (js, css, imágenes) pasa directo sin decodificarse
+    driver.scopes = [r'.*bbcollab\.com.*']
+    driver.captura = {'valor': None, 'evento': threading.Event()}
+    driver.request_interceptor = crear_interceptor(driver.captura)
+    return driver
 
-# 3. LOGIN MANUAL
-driver.get("https://upn-colaborador.blackboard.com/")
-print("\n🔑 POR FAVOR, INICIA SESIÓN MANUALMENTE...")
-input("👉 Presiona ENTER en esta consola cuando ya veas la lista de tus cursos...")
+def iniciar_navegador():
+    """Abre el primer Chrome: recupera la sesión del perfil o espera el login manual."""
+    # La barra de progreso se retira mientras tanto: el input() del login queda visible y
+    # la espera no cuenta en el ETA
+    with barra.pausa() if barra else nullcontext():
+        driver = abrir_chrome()
+        iniciar_sesion(driver)
+    return driver
+
+def clonar_sesion(driver_origen, numero):
+    """Abre otro Chrome y le copia las cookies de la sesión ya iniciada."""
+    selenium_cookies = cookies_de_sesion(driver_origen)
+
+    driver = abrir_chrome(numero)
+    driver.get(f"{URL_BLACKBOARD}/") # add_cookie exige estar en el mismo dominio
+    for c in selenium_cookies:
+        cookie = {k: c[k] for k in ('name', 'value', 'path', 'secure', 'httpOnly', 'expiry') if k in c}
+        try:
+            driver.add_cookie(cookie)
+        except Exception:
+            pass # cookies de otros subdominios no se pueden copiar desde aquí
+    return driver
+
+def capturar_token(driver, id_nav):
+    """Navega a las grabaciones del curso y devuelve el token Bearer (o None)."""
+    # Limpiamos peticiones y token del curso anterior
+    del driver.requests
+    driver.captura['valor'] = None
+    driver.captura['evento'].clear()
+    
+    # Navegamos directo a la sección de grabaciones
+    with telemetria.tramo('navegar', curso=id_nav):
+        driver.get(f"{URL_BLACKBOARD}/ultra/courses/{id_nav}/outline/collab/launchRecordings")
+    
+    # Esperamos solo lo necesario: wait() regresa apenas el interceptor ve el token
+    with telemetria.tramo('token', curso=id_nav) as t:
+        t['ok'] = driver.captura['evento'].wait(TIMEOUT_TOKEN)
+    return driver.captura['valor'] if t['ok'] else None
 
 # ==========================================
-# 4. EXTRACCIÓN MASIVA
+# 4. EXTRACCIÓN MASIVA (TOKEN -> COLA -> API EN PARALELO)
 # ==========================================
-lista_final = []
+# El navegador solo se encarga de conseguir el token de cada curso.
+# La llamada a la API se deja en la cola del pool de hilos y el navegador sigue con el siguiente curso.
+# Los cursos con un token vigente en caché van directo a la API sin abrir Chrome.
 
-for index, fila in df_trabajo.iterrows(): # iterrows recorre fila por fila
-    id_nrc = fila.get('ID')          
-    id_nav = fila.get('ID_Interno')
-    nombre_curso_excel = fila.get(col_curso, 'ND') # busca la columna col_curso, si no pornle nd y sigue trabajando
-    
-    # Validación básica: si no hay ID interno, saltamos
-    if pd.isna(id_nav) or id_nav == "" or id_nav == "nan": 
-        continue
+def descargar_grabaciones(token, curso, desde):
+    """Consulta la API de Collaborate con el token del curso, solo desde la marca de agua.
+
+    Recorre todas las páginas (de LIMITE_PAGINA en LIMITE_PAGINA) hasta agotar los resultados.
+    Devuelve (código HTTP, grabaciones crudas). El código es None si falló la conexión.
+    """
+    id_nrc = curso['ID']
+    api_url = f"{URL_COLLAB}/collab/api/csa/recordings"
+    grabaciones = []
+    offset = 0
+    while True:
+        params = {'startTime': desde, 'limit': LIMITE_PAGINA, 'offset': offset}
+        try:
+            with telemetria.tramo('api', curso=curso['ID_Interno'], nrc=id_nrc, offset=offset) as t:
+                resp = cliente_api.get(api_url, headers={"Authorization": token}, params=params, timeout=10)
+                t['codigo'] = resp.status_code
+        except Exception as e:
+            print(f"   ❌ NRC {id_nrc}: Error de conexión con la API: {e}")
+            return None, []
+
+        if resp.status_code != 200:
+            if resp.status_code != 401: # el 401 (token vencido) se reintenta con el navegador
+                print(f"   ⚠️ NRC {id_nrc}: Error API {resp.status_code}")
+            return resp.status_code, []
+
+        with telemetria.tramo('parseo', curso=curso['ID_Interno'], nrc=id_nrc) as t:
+            data = resp.json()
+            t['bytes'] = len(resp.content)
+        pagina = data.get('results', [])
+        grabaciones.extend(pagina)
+        offset += len(pagina)
+        # Página incompleta (o ya llegamos al total informado) = no hay más resultados
+        if len(pagina) < LIMITE_PAGINA or offset >= data.get('size', float('inf')):
+            break
 
-    print(f"[{index+1}/{len(df_trabajo)}] Procesando NRC: {id_nrc}.  ", end=" ")
+    print(f"   ✅ NRC {id_nrc}: {len(grabaciones)} videos nuevos.")
+    return resp.status_code, grabaciones
 
+def filas_reporte(pendientes):
+    """[(curso, grabaciones), ...] -> filas del reporte final de cada curso.
+
+    Las filas son listas en el orden de COLUMNAS_REPORTE, listas para la caché (JSON):
+    la fecha va como texto 'YYYY-MM-DD' y la hora como 'HH:MM:SS'. Todas las fechas
+    del lote se convierten en una sola pasada vectorizada.
+    """
+    cantidades = [len(grabaciones) for _, grabaciones in pendientes]
+    if not sum(cantidades):
+        return [[] for _ in pendientes]
+    df = pd.DataFrame([v for _, grabaciones in pendientes for v in grabaciones],
+                      columns=['id', 'mediaName', 'startTime', 'duration', 'guestLink'])
+    cursos = [curso for curso, grabaciones in pendientes for _ in grabaciones]
+
+    # Hora tal como la da la API (UTC), sin zona; una fecha ilegible queda vacía y su hora en 00:00:00
+    fecha = pd.to_datetime(df['startTime'], errors='coerce', utc=True, format='ISO8601').dt.tz_localize(None)
+    link = df['guestLink'].where(df['guestLink'].notna() & (df['guestLink'] != ''),
+                                 "https://us.bbcollab.com/recording/" + df['id'].astype(str))
+    reporte = pd.DataFrame({
+        'ID': [curso['ID'] for curso in cursos],
+        'Curso': [curso['Curso'] for curso in cursos],
+        'Docente': [curso['Docente'] for curso in cursos],
+        'Nombre Video': df['mediaName'],
+        'Fecha': fecha.dt.strftime('%Y-%m-%d'), # IMPORTANTE: se vuelve OBJETO FECHA al escribir el lote
+        'Hora': fecha.dt.strftime('%H:%M:%S').fillna("00:00:00"),
+        'Duración (min)': (pd.to_numeric(df['duration'], errors='coerce').fillna(0) / 60000).round(1),
+        'Link': link,
+    }, columns=COLUMNAS_REPORTE)
+    filas = reporte.astype(object).where(reporte.notna(), None).values.tolist()
+
+    # Se separan de nuevo por curso (para guardarlas en la caché)
+    por_curso, inicio = [], 0
+    for cantidad in cantidades:
+        por_curso.append(filas[inicio:inicio + cantidad])
+        inicio += cantidad
+    return por_curso
+
+# --- CHECKPOINT EN DISCO ---
+# Cada curso terminado se anota en un JSONL (y sus grabaciones ya quedaron en el almacén),
+# así un cierre de Chrome o sesión vencida no obliga a repetir los cursos ya hechos.
+def leer_checkpoint():
+    """IDs internos marcados como completados ('ok') en la corrida anterior."""
+    completados = set()
+    if os.path.exists(ARCHIVO_CHECKPOINT):
+        with open(ARCHIVO_CHECKPOINT, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    continue # línea cortada por un cierre brusco
+                if registro.get('estado') == 'ok':
+                    completados.add(registro['ID_Interno'])
+    return completados
+
+def anotar_checkpoint(curso, estado, videos=0):
+    """Marca el curso como terminado (en disco y en la barra de progreso)."""
+    if barra:
+        barra.avanzar()
+    with open(ARCHIVO_CHECKPOINT, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({
+            'ID': curso['ID'], 'ID_Interno': curso['ID_Interno'], 'estado': estado,
+            'videos': videos, 'hora': datetime.now().isoformat(timespec='seconds')
+        }, ensure_ascii=False) + "\n")
+
+def consultar_y_guardar(token, curso, token_de_cache):
+    """Tarea del pool: consulta la API y guarda el resultado del curso apenas responde."""
     try:
-        # Limpiamos peticiones anteriores
-        del driver.requests
-        
-        # Navegamos directo a la sección de grabaciones
-        driver.get(f"https://upn.blackboard.com/ultra/courses/{id_nav}/outline/collab/launchRecordings")
-        
-        token_encontrado = None
-        # Esperamos máx 15 seg por el token
-        for _ in range(15):
-            time.sleep(1) # Espera leve
-            for request in driver.requests: # revisa uno por uno
-                if request.response and "bbcollab.com" in request.url and "recordings" in request.url:
-                    auth = request.headers.get('Authorization') # Authorization es la llave maestra
-                    if auth and "Bearer" in auth: # Bearer token significa el q tiene la llave tiene permiso
-                        token_encontrado = auth
-                        break
-            if token_encontrado: break
-        
-        if token_encontrado:
-            # Consulta a la API de Collaborate (trae hasta 500 videos desde 2024)
-            api_url = "https://us-lti.bbcollab.com/collab/api/csa/recordings?startTime=2024-01-01T00:00:00.000Z&limit=500"
-            resp = requests.get(api_url, headers={"Authorization": token_encontrado}, timeout=10)
-            
-            if resp.status_code == 200:
-                data = resp.json().get('results', [])
-                print(f" -> ✅ {len(data)} videos.")
-                
-                for v in data:
-                    fecha_cruda = v.get('startTime')
-                    try:
-                        # Convertimos a objeto datetime para poder manipularlo luego
-                        dt_obj = pd.to_datetime(fecha_cruda).replace(tzinfo=None)
-                        solo_hora = dt_obj.time().replace(microsecond=0)
-                    except:
-                        dt_obj = None
-                        solo_hora = "00:00:00"
-
-                    lista_final.append({
-                        'ID': id_nrc,
-                        'Curso': nombre_curso_excel,
-                        'Docente': fila.get('DOCENTE', fila.get('Profesor', '')),
-                        'Nombre Video': v.get('mediaName'),
-                        'Fecha': dt_obj, # IMPORTANTE: Se guarda como OBJETO FECHA
-                        'Hora': solo_hora,
-                        'Duración (min)': round(v.get('duration', 0) / 60000, 1),
-                        'Link': v.get('guestLink') or f"https://us.bbcollab.com/recording/{v.get('id')}"
-                    })
+        codigo, grabaciones = descargar_grabaciones(token, curso, marcas[curso['ID_Interno']])
+    except Exception as e:
+        print(f"   ❌ NRC {curso['ID']}: Respuesta inválida de la API: {e}")
+        codigo, grabaciones = None, []
+    with candado:
+        if codigo == 200:
+            with telemetria.tramo('guardar', curso=curso['ID_Interno'], nrc=curso['ID'], videos=len(grabaciones)):
+                guardar_grabaciones(almacen, curso['ID_Interno'], grabaciones)
+            anotar_checkpoint(curso, 'ok', len(grabaciones))
+        elif codigo == 401 and token_de_cache:
+            descartar_token(cache, curso['ID_Interno'])
+            reintentar.append(curso)
+        elif codigo is None or codigo in ESTADOS_REINTENTABLES:
+            # Se agotaron los reintentos inmediatos: el curso vuelve a la cola al final de la corrida
+            fallidos.append((token, curso, token_de_cache))
+        else:
+            if codigo == 401:
+                print(f"   ⚠️ NRC {curso['ID']}: Error API 401 con token recién capturado.")
+            anotar_checkpoint(curso, 'error_api')
+
+def encolar(pool, token, curso, token_de_cache):
+    return pool.submit(consultar_y_guardar, token, curso, token_de_cache)
+
+def preparar_navegadores(cantidad):
+    """Login manual en el primer Chrome y copia de la sesión en los demás (solo la primera vez)."""
+    drivers = estado_navegador['drivers']
+    if not drivers:
+        drivers.append(iniciar_navegador())
+    while len(drivers) < cantidad:
+        print(f"🧬 Abriendo navegador {len(drivers)+1}/{cantidad} con la sesión copiada...")
+        drivers.append(clonar_sesion(drivers[0], len(drivers) + 1))
+    return drivers
+
+def trabajador_navegador(numero, driver, cola, pool):
+    """Hilo de un navegador: toma cursos de la cola compartida hasta vaciarla."""
+    stats = {'cursos': 0, 'segundos': 0.0}
+    while True:
+        try:
+            curso = cola.get_nowait()
+        except queue.Empty:
+            break
+        inicio = time.time()
+        prefijo = f"[N{numero}] [{curso['index']+1}/{total_cursos}] NRC {curso['ID']}"
+        try:
+            token_encontrado = capturar_token(driver, curso['ID_Interno'])
+            if token_encontrado:
+                with candado:
+                    registrar_token(cache, curso['ID_Interno'], token_encontrado)
+                # No esperamos la respuesta: la API se consulta en segundo plano
+                encolar(pool, token_encontrado, curso, token_de_cache=False)
+                print(f"{prefijo} -> 🔑 Token capturado (en cola para la API).")
             else: 
-                print(f" -> ⚠️ Error API: {resp.status_code}")
-        else: 
-            print(" -> ❌ Sin Token (Curso sin grabaciones o error de carga).")
+                print(f"{prefijo} -> ❌ Sin Token (Curso sin grabaciones o error de carga).")
+                with candado:
+                    anotar_checkpoint(curso, 'sin_token')
+        except Exception as e:
+            print(f"{prefijo} -> ❌ Error general: {e}")
+        stats['cursos'] += 1
+        stats['segundos'] += time.time() - inicio
+    with candado: # se acumula si el navegador trabaja en más de una tanda (p. ej. reintentos 401)
+        total = estado_navegador['stats'].setdefault(numero, {'cursos': 0, 'segundos': 0.0})
+        total['cursos'] += stats['cursos']
+        total['segundos'] += stats['segundos']
+
+def procesar_con_navegador(pool, pendientes):
+    """Reparte los cursos entre los navegadores (los abre la primera vez) y encola sus consultas."""
+    if not pendientes:
+        return
+    # No tiene sentido abrir más navegadores que cursos pendientes
+    drivers = preparar_navegadores(max(1, min(args.navegadores, len(pendientes))))
+
+    cola = queue.Queue()
+    for curso in pendientes:
+        cola.put(curso)
 
+    hilos = [threading.Thread(target=trabajador_navegador, args=(i+1, d, cola, pool)) for i, d in enumerate(drivers)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+def lanzar_y_consultar(curso):
+    """Tarea del pool en modo API: token por lanzamiento LTI (HTTP) y luego consulta de grabaciones."""
+    try:
+        with telemetria.tramo('token_lti', curso=curso['ID_Interno'], nrc=curso['ID']) as t:
+            codigo, token = obtener_token_lti(estado_http['cliente'], curso['ID_Interno'])
+            t['codigo'] = codigo
+    except requests.RequestException as e:
+        print(f"   ⚠️ NRC {curso['ID']}: Error de conexión en el lanzamiento LTI: {e}")
+        codigo, token = None, None
     except Exception as e:
-        print(f" -> ❌ Error general: {e}")
+        print(f"   ❌ NRC {curso['ID']}: Error en el lanzamiento LTI: {e}")
+        codigo, token = 0, None
+    if not token:
+        with candado:
+            if codigo is None or codigo in ESTADOS_REINTENTABLES:
+                # Falla temporal (429/5xx/conexión): el lanzamiento se repite en las rondas finales
+                fallidos.append((None, curso, False))
+                return
+            print(f"   ❌ NRC {curso['ID']}: Sin Token (lanzamiento LTI sin respuesta válida).")
+            anotar_checkpoint(curso, 'sin_token')
+        return
+    with candado:
+        registrar_token(cache, curso['ID_Interno'], token)
+    consultar_y_guardar(token, curso, token_de_cache=False)
+
+def procesar_sin_navegador(pool, pendientes):
+    """Modo API: Chrome solo para el login; los lanzamientos LTI van por la sesión HTTP compartida."""
+    if not pendientes:
+        return
+    if estado_http['cliente'] is None:
+        # BB_COOKIES permite saltar el login (p. ej. contra un servidor local de pruebas)
+        cookie_string = os.getenv("BB_COOKIES")
+        if not cookie_string:
+            driver = iniciar_navegador()
+            cookie_string = cookies_como_texto(cookies_de_sesion(driver))
+            driver.quit() # Ya no necesitamos el navegador, cerramos para liberar RAM
+            print("✅ Cookies capturadas. Continuando sin navegador.")
+        # Los lanzamientos pasan por el mismo limitador de tasa que la API (los reintentos los maneja ClienteAPI)
+        estado_http['cliente'] = ClienteAPI(crear_sesion(cookie_string, conexiones=args.hilos, reintentos=False), cliente_api.limitador)
+    for curso in pendientes:
+        pool.submit(lanzar_y_consultar, curso)
+    print(f"📨 {len(pendientes)} lanzamientos LTI en cola.")
+
+def reportar_navegadores():
+    """Muestra cuántos cursos atendió cada navegador y a qué ritmo."""
+    for numero, stats in sorted(estado_navegador['stats'].items()):
+        ritmo = stats['cursos'] / stats['segundos'] * 60 if stats['segundos'] else 0
+        print(f"   🖥️ Navegador {numero}: {stats['cursos']} cursos en {stats['segundos']:.0f} s ({ritmo:.1f} cursos/min)")
+
+
+def preparar_cursos(df_trabajo):
+    """Filtra supervisores, quita filas sin ID interno y repetidos, y arma la lista de cursos."""
+    # --- SUPERVISORES: uno, varios o todos (por defecto) ---
+    if args.soporte and 'SOPORTE' in df_trabajo.columns:
+        df_trabajo = df_trabajo[df_trabajo['SOPORTE'].str.upper().isin([x.upper() for x in args.soporte])]
+        print(f"👤 Supervisores seleccionados: {', '.join(args.soporte)}")
 
-# Cerramos navegador al terminar todo
-driver.quit()
+    # Primero fuera las filas sin ID interno: si no, drop_duplicates las junta en una sola y las cuenta como repetidas
+    sin_llave = df_trabajo['ID_Interno'].isna() | df_trabajo['ID_Interno'].astype(str).isin(['', 'nan'])
+    if sin_llave.any():
+        print(f"⏭️ {sin_llave.sum()} filas sin ID_Interno omitidas.")
+    df_trabajo = df_trabajo[~sin_llave]
+
+    # Un curso compartido entre supervisores (o con nombres contradictorios) se visita una sola vez
+    total_filas = len(df_trabajo)
+    df_trabajo = df_trabajo.drop_duplicates(subset=['ID_Interno']).reset_index(drop=True)
+    if total_filas > len(df_trabajo):
+        print(f"🧹 {total_filas - len(df_trabajo)} filas repetidas (mismo ID_Interno) omitidas.")
+
+    # --- SIN FRENOS ---
+    print(f"📚 Cursos detectados en archivo: {len(df_trabajo)}")
+    print("🚀 Iniciando procesamiento masivo...")
+
+    # --- DETECTIVE DE COLUMNAS (Para encontrar el nombre del curso automáticamente) ---
+    col_curso = 'ND'
+    posibles_nombres = ['Curso', 'Nombre', 'Asignatura', 'Materia', 'Descripción']
+    for col in df_trabajo.columns:
+        for posible in posibles_nombres:
+            if posible.lower() in col.lower():
+                col_curso = col
+                break
+        if col_curso != 'ND': break
+    print(f"👉 Nombre del curso tomado de columna: '{col_curso}'")
+
+    # Lista de cursos válidos (con ID interno) en el orden del Excel de entrada
+    cursos = []
+    for index, fila in df_trabajo.iterrows(): # iterrows recorre fila por fila
+        id_nav = fila.get('ID_Interno')
+        # Validación básica: si no hay ID interno, saltamos
+        if pd.isna(id_nav) or id_nav == "" or id_nav == "nan": 
+            continue
+        cursos.append({
+            'index': index,
+            'ID': fila.get('ID'),
+            'ID_Interno': id_nav,
+            'Curso': fila.get(col_curso, 'ND'), # busca la columna col_curso, si no pornle nd y sigue trabajando
+            'Docente': fila.get('DOCENTE', fila.get('Profesor', ''))
+        })
+    return cursos, len(df_trabajo)
+
+def reintentar_vencidos(pool, procesar_pendientes):
+    """Los cursos cuyo token de caché fue rechazado (401) piden un token nuevo."""
+    with candado:
+        reintentar_ordenados = sorted(reintentar, key=lambda c: c['index'])
+        reintentar.clear()
+    if reintentar_ordenados:
+        print(f"\n🔁 {len(reintentar_ordenados)} tokens de caché vencidos. Pidiendo tokens nuevos...")
+    procesar_pendientes(pool, reintentar_ordenados)
+
+def elegir_por_calendario(cursos_a_procesar):
+    """Solo los cursos con una sesión terminada desde su última consulta, la más reciente primero."""
+    if not os.path.exists(ARCHIVO_AGENDA):
+        print("⚠️ No se encontró supervisar_clases.parquet: se visitan todos los cursos.")
+        return cursos_a_procesar
+    df_agenda = leer_tabla(ARCHIVO_AGENDA, 'supervisar_clases', columnas=['ID', 'FECHAS', 'HORA_INICIO', 'HORA_FIN'])
+    elegidos, omitidos = planificar(cursos_a_procesar, df_agenda, obtener_actualizaciones(almacen))
+    print(f"📅 Calendario: {len(elegidos)} cursos con sesión desde la última consulta | "
+          f"{omitidos} sin sesiones nuevas omitidos (--force-all para visitar todos).")
+    return elegidos
+
+def cosechar(cursos_a_procesar):
+    """Tokens (caché, navegador o HTTP) -> pool de la API -> almacén, para los cursos indicados."""
+    global barra
+    print(f"⚙️ Llamadas simultáneas a la API: {args.hilos} | Navegadores: {args.navegadores}")
+
+    # La barra avanza cada vez que un curso queda anotado en el checkpoint
+    with BarraProgreso(len(cursos_a_procesar)) as barra:
+        with ThreadPoolExecutor(max_workers=args.hilos) as pool: # el with espera a que terminen todas las llamadas pendientes
+            # A) Cursos con token vigente en caché: directo a la API
+            futuros_cache = []
+            pendientes = []
+            for curso in cursos_a_procesar:
+                token = token_vigente(cache, curso['ID_Interno'])
+                if token:
+                    futuros_cache.append(encolar(pool, token, curso, token_de_cache=True))
+                else:
+                    pendientes.append(curso)
+            print(f"♻️ {len(futuros_cache)} cursos con token en caché | 🌐 {len(pendientes)} requieren navegador.")
+
+            # B) Cursos sin token: el navegador (o la sesión HTTP en --modo-api) los atiende mientras la API trabaja en paralelo
+            procesar_pendientes = procesar_sin_navegador if args.modo_api else procesar_con_navegador
+            procesar_pendientes(pool, pendientes)
+
+            # C) Tokens de caché rechazados (401): vuelven al navegador
+            wait(futuros_cache)
+            reintentar_vencidos(pool, procesar_pendientes)
+
+            print("\n⏳ Esperando las últimas respuestas de la API...")
+
+        # D) Fallas temporales (429/5xx/conexión): otra vuelta al final, cuando el servidor ya tuvo tiempo de recuperarse
+        for ronda in range(1, RONDAS_FINALES + 1):
+            with candado:
+                lote = sorted(fallidos, key=lambda f: f[1]['index'])
+                fallidos.clear()
+            if not lote:
+                break
+            print(f"\n🔁 Ronda final {ronda}/{RONDAS_FINALES}: reintentando {len(lote)} cursos con fallas temporales...")
+            with ThreadPoolExecutor(max_workers=args.hilos) as pool:
+                # Sin token (lanzamiento LTI fallido): se repite el lanzamiento completo.
+                # Con token: pudo vencer mientras tanto, así que un 401 vuelve por un token nuevo (como los de caché)
+                wait([pool.submit(lanzar_y_consultar, curso) if token is None else encolar(pool, token, curso, token_de_cache=True)
+                      for token, curso, _ in lote])
+                reintentar_vencidos(pool, procesar_pendientes) # tokens vencidos: navegador o lanzamiento LTI
+        with candado:
+            for token, curso, _ in fallidos:
+                print(f"   ❌ NRC {curso['ID']}: Sin respuesta de la API tras {RONDAS_FINALES} rondas finales.")
+                anotar_checkpoint(curso, 'sin_token' if token is None else 'error_api')
+            fallidos.clear()
+    barra = None
+    print(cliente_api.resumen())
+
+    guardar_cache(ARCHIVO_CACHE_TOKENS, cache)
+
+    # Cerramos los navegadores al terminar todo (si se llegaron a abrir)
+    if estado_navegador['drivers']:
+        print("\n📊 Rendimiento por navegador:")
+        reportar_navegadores()
+    for driver in estado_navegador['drivers']:
+        driver.quit()
 
 # ==========================================
 # 5. EXPORTACIÓN TIPO "SUPERVISIÓN" (MERGE READY)
 # ==========================================
-if lista_final:
+def escribir_lote(tabla, filas):
+    """Filas de varios cursos -> DataFrame con la fecha como objeto fecha -> hoja del reporte."""
+    if not filas:
+        return
+    df_lote = pd.DataFrame(filas, columns=COLUMNAS_REPORTE)
+    # LIMPIEZA FINAL DE FECHA:
+    # Solo el día (00:00:00) para que cruce perfecto con tu panel.
+    df_lote['Fecha'] = pd.to_datetime(df_lote['Fecha'], format='%Y-%m-%d', errors='coerce')
+    with telemetria.tramo('excel', filas=len(df_lote)):
+        tabla.escribir_df(df_lote)
+
+def armar_lote(con_cache, bloque):
+    """[(curso, estado en el almacén), ...] -> filas del reporte en el mismo orden.
+
+    Los cursos cuyo estado no cambió toman sus filas de la caché sin leer el almacén;
+    el resto se lee, se transforma de una vez y se guarda. Devuelve (filas, cursos reutilizados).
+    """
+    huellas = [huella(curso, estado) for curso, estado in bloque]
+    en_cache = leer_filas(con_cache, huellas)
+    pendientes = [i for i, h in enumerate(huellas) if h not in en_cache]
+    with telemetria.tramo('armar_reporte', cursos=len(pendientes)):
+        nuevas = filas_reporte([(bloque[i][0], leer_grabaciones(almacen, bloque[i][0]['ID_Interno'])) for i in pendientes])
+    por_curso = [en_cache.get(h) for h in huellas]
+    for i, filas in zip(pendientes, nuevas):
+        por_curso[i] = filas
+    guardar_filas(con_cache, {huellas[i]: filas for i, filas in zip(pendientes, nuevas)})
+    return [fila for filas in por_curso for fila in filas], len(bloque) - len(pendientes)
+
+def exportar_reporte(cursos):
+    """Arma el reporte desde el almacén (historial completo), en el orden original de los cursos.
+
+    Se escribe por lotes en un Excel de memoria constante. Devuelve la cantidad de filas (o None).
+    """
+    # Cantidad de grabaciones, versión y marca de cada curso (sin cargar las grabaciones)
+    resumen = resumen_cursos(almacen, [curso['ID_Interno'] for curso in cursos])
+    total = sum(estado[0] for estado in resumen.values())
+    if not total:
+        print("\n⚠️ ALERTA: No se extrajeron datos de ningún curso.")
+        return None
+
     print("\n>>> Generando reporte final optimizado...")
-    df_export = pd.DataFrame(lista_final)
+    ruta_csv = os.path.splitext(ARCHIVO_SALIDA)[0] + ".csv" if args.csv else None
+    con_cache = abrir_cache_reporte(ARCHIVO_CACHE_REPORTE)
+    reutilizados = 0
+
+    # EXPORTACIÓN CON FORMATO AVANZADO (XLSXWRITER, FILA POR FILA)
+    # Las fechas se ven como dd/mm/yyyy (formato por defecto del libro)
+    try:
+        with LibroExcel(ARCHIVO_SALIDA) as libro:
+            # A) Convertir rango en TABLA INTELIGENTE (Estilo Azul)
+            tabla = libro.agregar_tabla('Reporte', COLUMNAS_REPORTE, filas=total, nombre_tabla='TablaReporteCompleto', ruta_csv=ruta_csv)
+            worksheet = tabla.hoja
+            formato_centrar = libro.formato({'align': 'center', 'valign': 'vcenter'})
+
+            # B) Ajustar anchos de columnas
+            worksheet.set_column(0, len(COLUMNAS_REPORTE) - 1, 15, formato_centrar) # Ancho base centrado
+            worksheet.set_column('B:B', 30) # Curso
+            worksheet.set_column('C:C', 35) # Docente (Aumentado un poco por nombres largos)
+            worksheet.set_column('E:E', 15) # Fecha (formato controlado por el libro)
+            worksheet.set_column('H:H', 65) # Link
+
+            bloque, filas_bloque = [], 0
+            for i, curso in enumerate(cursos):
+                estado = resumen.get(curso['ID_Interno'], (0, 0, None))
+                bloque.append((curso, estado))
+                filas_bloque += estado[0]
+                if filas_bloque >= LOTE_EXPORTACION or i == len(cursos) - 1:
+                    filas, n = armar_lote(con_cache, bloque)
+                    escribir_lote(tabla, filas)
+                    reutilizados += n
+                    bloque, filas_bloque = [], 0
+    finally:
+        con_cache.close()
 
-    # LIMPIEZA FINAL DE FECHA:
-    # .normalize() elimina la hora interna (la pone en 00:00:00) para que cruce perfecto con tu panel.
-    df_export['Fecha'] = pd.to_datetime(df_export['Fecha'], errors='coerce').dt.normalize()
-
-    # Seleccionamos columnas en orden
-    cols = ['ID', 'Curso', 'Docente', 'Nombre Video', 'Fecha', 'Hora', 'Duración (min)', 'Link']
-    df_export = df_export[[c for c in cols if c in df_export.columns]]
-
-    # EXPORTACIÓN CON FORMATO AVANZADO (XLSXWRITER)
-    # datetime_format='dd/mm/yyyy' fuerza la vista visual correcta
-    with pd.ExcelWriter(ARCHIVO_SALIDA, engine='xlsxwriter', datetime_format='dd/mm/yyyy') as writer:
-        df_export.to_excel(writer, sheet_name='Reporte', index=False)
-        
-        workbook = writer.book
-        worksheet = writer.sheets['Reporte']
-        
-        formato_centrar = workbook.add_format({'align': 'center', 'valign': 'vcenter'})
-        
-        # A) Convertir rango en TABLA INTELIGENTE (Estilo Azul)
-        (max_fila, max_col) = df_export.shape
-        lista_columnas = [{'header': col} for col in df_export.columns]
-        
-        worksheet.add_table(0, 0, max_fila, max_col - 1, {
-            'columns': lista_columnas,
-            'style': 'TableStyleMedium2',
-            'name': 'TablaReporteCompleto'
-        })
-        
-        # B) Ajustar anchos de columnas
-        worksheet.set_column(0, max_col - 1, 15, formato_centrar) # Ancho base centrado
-        worksheet.set_column('B:B', 30) # Curso
-        worksheet.set_column('C:C', 35) # Docente (Aumentado un poco por nombres largos)
-        worksheet.set_column('E:E', 15) # Fecha (formato controlado por writer)
-        worksheet.set_column('H:H', 65) # Link
-        
     print(f"------------------------------------------------")
     print(f"✅ PROCESO COMPLETADO.")
     print(f"   Archivo generado: {ARCHIVO_SALIDA}")
-    print(f"   Total de registros: {len(df_export)}")
+    if ruta_csv:
+        print(f"   Copia CSV: {ruta_csv}")
+    print(f"   Total de registros: {total}")
+    print(f"   Cursos sin cambios (filas de la caché): {reutilizados}/{len(cursos)}")
     print(f"   Formato Fecha: dd/mm/yyyy (Visual) | Value (Date) -> Listo para Merge")
     print(f"------------------------------------------------")
+    return total
+
+# ==========================================
+# 6. EJECUCIÓN
+# ==========================================
+def ejecutar(argv=None, df_trabajo=None):
+    """Corre el robot completo. Devuelve la cantidad de filas del reporte (o None).
+
+    main.py le pasa df_trabajo en memoria; ejecutado como script lo lee del Parquet del ETL.
+    """
+    global args, cache, almacen, marcas, cliente_api, total_cursos, telemetria
+    args = crear_parser().parse_args(argv)
+
+    print("--- 🤖 ROBOT UPN: MODO PRODUCCIÓN (TODOS LOS CURSOS) ---")
+
+    if df_trabajo is None:
+        if not os.path.exists(ARCHIVO_INPUT):
+            print(f"❌ Error CRÍTICO: No encuentro el archivo de entrada en:\n{ARCHIVO_INPUT}")
+            print("👉 Ejecuta primero '01_etl_programacion.py'")
+            return None
+        # El Parquet ya trae los IDs como texto (esquema fijo), no hace falta forzarlos
+        df_trabajo = leer_tabla(ARCHIVO_INPUT, 'resumen_con_llave')
+
+    cursos, total_cursos = preparar_cursos(df_trabajo)
+
+    cursos_a_procesar = cursos
+    if args.resume:
+        completados = leer_checkpoint()
+        cursos_a_procesar = [c for c in cursos if c['ID_Interno'] not in completados]
+        print(f"⏯️ Reanudando: {len(cursos) - len(cursos_a_procesar)} cursos ya completados se omiten.")
+    else:
+        open(ARCHIVO_CHECKPOINT, 'w').close() # corrida nueva: checkpoint vacío
+
+    # Estado limpio para esta corrida
+    cache = cargar_cache(ARCHIVO_CACHE_TOKENS)
+    almacen = abrir_almacen(ARCHIVO_ALMACEN)
+    if not args.force_all:
+        cursos_a_procesar = elegir_por_calendario(cursos_a_procesar)
+    marcas = {c['ID_Interno']: obtener_marca(almacen, c['ID_Interno']) for c in cursos_a_procesar}
+    # Conexiones reutilizables hacia la API de Collaborate; los reintentos los maneja el cliente (no urllib3)
+    cliente_api = ClienteAPI(crear_sesion(conexiones=args.hilos, reintentos=False), LimitadorAdaptativo(args.tasa))
+    estado_navegador.update({'drivers': [], 'stats': {}})
+    estado_http['cliente'] = None
+    reintentar.clear()
+    fallidos.clear()
+    telemetria = abrir_telemetria('robot') # tramos de esta corrida -> 02_outputs/telemetria.jsonl
+
+    try:
+        cosechar(cursos_a_procesar)
+        return exportar_reporte(cursos)
+    finally:
+        almacen.close()
+        telemetria.resumen()
+        telemetria.cerrar()
+
 
-else:
-    print("\n⚠️ ALERTA: No se extrajeron datos de ningún curso.")
\ No newline at end of file
+if __name__ == "__main__":
+    ejecutar()
@@ -0,0 +1,131 @@
+import os
+import argparse
+from intercambio import leer_tabla
+from exportacion import LibroExcel
+from almacen_grabaciones import abrir_almacen, leer_todas
+from conciliacion import conciliar, contar_estados, OK
+from telemetria import Telemetria, abrir_telemetria
+
+# ==========================================
+# 1. CONFIGURACIÓN DE RUTAS
+# ==========================================
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Inputs: agenda del ETL, almacén del robot y mapa de llaves (ID <-> ID_Interno)
+ARCHIVO_AGENDA = os.path.join(BASE_DIR, "01_data", "supervisar_clases.parquet")
+ARCHIVO_ALMACEN = os.path.join(BASE_DIR, "01_data", "grabaciones.db")
+ARCHIVO_MAPA = os.path.join(BASE_DIR, "01_data", "base_maestra_ids.parquet")
+ARCHIVO_RESUMEN_LLAVE = os.path.join(BASE_DIR, "01_data", "resumen_con_llave.parquet")
+
+# Output: reporte conciliado (una fila por sesión programada)
+ARCHIVO_SALIDA = os.path.join(BASE_DIR, "02_outputs", "REPORTE_CONCILIACION.xlsx")
+
+COLUMNAS_SESIONES = ['SOPORTE', 'CURSO', 'DOCENTE', 'ID', 'SESIÓN', 'FECHAS', 'HORA_INICIO', 'HORA_FIN',
+                     'ESTADO DE CLASE', 'Estado conciliación', 'Grabaciones', 'Duración programada (min)',
+                     'Duración grabada (min)', 'Inicio grabación', 'Link']
+COLUMNAS_SIN_SESION = ['ID', 'nombre', 'inicio_grabacion', 'Duración grabada (min)', 'link']
+
+telemetria = Telemetria('conciliacion')
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Conciliación de sesiones programadas con grabaciones")
+    parser.add_argument("--soporte", nargs="+", help="Conciliar solo estos supervisores (por defecto: todos)")
+    return parser
+
+
+def leer_mapa():
+    """ID <-> ID_Interno: el mapa completo (incluye cursos finalizados) o, si falta, el del ETL."""
+    for ruta, nombre in ((ARCHIVO_MAPA, 'mapa_ids'), (ARCHIVO_RESUMEN_LLAVE, 'resumen_con_llave')):
+        if os.path.exists(ruta):
+            return leer_tabla(ruta, nombre, columnas=['ID', 'ID_Interno']).dropna()
+    return None
+
+
+def exportar_conciliacion(ruta, df_sesiones, df_sin_sesion):
+    # El inicio de la grabación lleva la hora; el resto de fechas se ve como dd/mm/yyyy
+    fecha_hora = {'Inicio grabación': 'dd/mm/yyyy hh:mm'}
+    with LibroExcel(ruta) as libro:
+        t_sesiones = libro.agregar_tabla('Sesiones', df_sesiones.columns, len(df_sesiones), 'TablaConciliacion', fecha_hora)
+        t_sin_sesion = libro.agregar_tabla('Sin sesión', df_sin_sesion.columns, len(df_sin_sesion), 'TablaSinSesion', fecha_hora)
+        f_center = libro.formato({'align': 'center', 'valign': 'vcenter'})
+        # Resaltado de las sesiones con problemas
+        f_alerta = libro.formato({'bg_color': '#FFC7CE', 'font_color': '#9C0006'})
+
+        ws = t_sesiones.hoja
+        ws.set_column(0, len(df_sesiones.columns) - 1, 15, f_center)
+        ws.set_column('B:C', 30)
+        ws.set_column('J:J', 20)
+        ws.set_column('N:N', 18)
+        ws.set_column('O:O', 65)
+        if len(df_sesiones):
+            ws.conditional_format(1, 9, len(df_sesiones), 9, {
+                'type': 'cell', 'criteria': 'not equal to', 'value': f'"{OK}"', 'format': f_alerta
+            })
+        ws_sin = t_sin_sesion.hoja
+        ws_sin.set_column(0, len(df_sin_sesion.columns) - 1, 15, f_center)
+        ws_sin.set_column('B:B', 40)
+        ws_sin.set_column('C:C', 18)
+        ws_sin.set_column('E:E', 65)
+
+        t_sesiones.escribir_df(df_sesiones)
+        t_sin_sesion.escribir_df(df_sin_sesion)
+
+
+# ==========================================
+# 2. EJECUCIÓN
+# ==========================================
+def ejecutar(argv=None, df_agenda=None):
+    """Cruza la agenda con el almacén de grabaciones y escribe el reporte. Devuelve el DataFrame de sesiones (o None)."""
+    global telemetria
+    args = crear_parser().parse_args(argv)
+    print("--- 🔗 CONCILIACIÓN: SESIONES PROGRAMADAS vs GRABACIONES ---")
+
+    if df_agenda is None:
+        if not os.path.exists(ARCHIVO_AGENDA):
+            print(f"❌ No se encontró la agenda:\n{ARCHIVO_AGENDA}\n👉 Ejecuta primero '01_etl_programacion.py'")
+            return None
+        df_agenda = leer_tabla(ARCHIVO_AGENDA, 'supervisar_clases')
+    if not os.path.exists(ARCHIVO_ALMACEN):
+        print("❌ No hay grabaciones descargadas todavía.\n👉 Ejecuta primero '03_bot_scraper.py'")
+        return None
+    df_mapa = leer_mapa()
+    if df_mapa is None:
+        print("❌ No se encontró el mapa de llaves.\n👉 Ejecuta primero '02_mapa_llaves.py'")
+        return None
+
+    if args.soporte:
+        df_agenda = df_agenda[df_agenda['SOPORTE'].str.upper().isin([x.upper() for x in args.soporte])]
+
+    telemetria = abrir_telemetria('conciliacion')
+    almacen = abrir_almacen(ARCHIVO_ALMACEN)
+    try:
+        with telemetria.tramo('leer_almacen') as t:
+            df_grabaciones = leer_todas(almacen)
+            t['filas'] = len(df_grabaciones)
+        with telemetria.tramo('conciliar', sesiones=len(df_agenda)):
+            df_sesiones, df_sin_sesion = conciliar(df_agenda, df_grabaciones, df_mapa)
+
+        # Las grabaciones sin sesión solo interesan para los cursos de la agenda
+        df_sin_sesion = df_sin_sesion[df_sin_sesion['ID'].isin(set(df_sesiones['ID']))]
+        df_sesiones = df_sesiones[[c for c in COLUMNAS_SESIONES if c in df_sesiones.columns]]
+        df_sin_sesion = df_sin_sesion[COLUMNAS_SIN_SESION].rename(columns={
+            'nombre': 'Nombre Video', 'inicio_grabacion': 'Inicio grabación', 'link': 'Link'
+        })
+
+        with telemetria.tramo('excel', filas=len(df_sesiones)):
+            exportar_conciliacion(ARCHIVO_SALIDA, df_sesiones, df_sin_sesion)
+    finally:
+        almacen.close()
+        telemetria.cerrar()
+
+    print(f"📊 {len(df_sesiones)} sesiones conciliadas con {len(df_grabaciones)} grabaciones:")
+    for estado, cantidad in contar_estados(df_sesiones).items():
+        print(f"   {estado:<14} {cantidad}")
+    print(f"   Grabaciones sin sesión cercana: {len(df_sin_sesion)}")
+    print(f"✅ Reporte generado: {ARCHIVO_SALIDA}")
+    return df_sesiones
+
+
+if __name__ == "__main__":
+    ejecutar()
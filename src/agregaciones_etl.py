@@ -0,0 +1,54 @@
+import pandas as pd
+
+# ==========================================
+# AGREGACIONES VECTORIZADAS DEL ETL
+# ==========================================
+# Reemplazan al groupby().apply(lambda ...) y al for por grupo: pandas hace todo
+# el trabajo en C y el tiempo ya no crece con la cantidad de cursos del panel.
+
+COLUMNAS_ALERTAS = ['ID', 'Tipo', 'Detalle', 'Acción']
+
+# (columna a revisar, tipo de alerta, acción sugerida) en el orden en que se reportan
+REGLAS_ALERTAS = [
+    ('CURSO', 'Nombre Contradictorio', 'Revisar Panel'),
+    ('DOCENTE', 'Múltiples Docentes', 'Verificar reemplazo'),
+]
+
+
+def estado_por_curso(df, por=('ID',)):
+    """ACTIVO si el curso tiene alguna celda vacía en 'ESTADO DE CLASE', si no FINALIZADO.
+
+    'por' son las columnas que identifican al curso (p. ej. ('SOPORTE', 'ID') para
+    calcular el estado de todos los supervisores en una sola pasada).
+    """
+    por = list(por)
+    # isna() marca celdas vacías y .any() por curso pregunta: "¿Hay al menos una vacía?"
+    hay_vacias = df['ESTADO DE CLASE'].isna().groupby([df[c] for c in por]).any()
+    estados = hay_vacias.map({True: 'ACTIVO', False: 'FINALIZADO'})
+    return estados.rename('ESTADO_CURSO').rename_axis(por).reset_index()
+
+
+def auditar_alertas(df, por=('ID',)):
+    """Alertas de cursos con más de un nombre de curso o más de un docente.
+
+    Mismo resultado que recorrer df.groupby('ID') con .dropna().unique(): los valores
+    del detalle salen en el orden en que aparecen en el panel.
+    """
+    por = list(por)
+    partes = []
+    for columna, tipo, accion in REGLAS_ALERTAS:
+        # Valores únicos por curso (sin vacíos), conservando el orden de aparición
+        unicos = df[por + [columna]].dropna().drop_duplicates()
+        repetidos = unicos[unicos.groupby(por)[columna].transform('size') > 1]
+        if repetidos.empty:
+            continue
+        detalle = repetidos[columna].astype(str).groupby([repetidos[c] for c in por]).agg(" / ".join)
+        parte = detalle.rename('Detalle').reset_index()
+        parte['Tipo'] = tipo
+        parte['Acción'] = accion
+        partes.append(parte[por + ['Tipo', 'Detalle', 'Acción']])
+
+    if not partes:
+        return pd.DataFrame(columns=por + COLUMNAS_ALERTAS[1:])
+    # Orden por curso; dentro del mismo curso se respeta el orden de REGLAS_ALERTAS (sort estable)
+    return pd.concat(partes, ignore_index=True).sort_values(por, kind='stable').reset_index(drop=True)
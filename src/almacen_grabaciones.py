@@ -0,0 +1,122 @@
+import sqlite3
+from datetime import datetime
+import pandas as pd
+
+# ==========================================
+# ALMACÉN LOCAL DE GRABACIONES (SQLite)
+# ==========================================
+# Guarda todas las grabaciones ya descargadas de cada curso y una "marca de agua"
+# (la fecha de la grabación más reciente). En cada corrida solo se piden a la API
+# las grabaciones desde esa marca, y el reporte final se arma desde aquí.
+
+# Primera descarga de un curso sin historial: igual que la consulta original
+FECHA_INICIAL = "2024-01-01T00:00:00.000Z"
+
+# Collaborate publica algunas grabaciones con horas de retraso: una sesión anterior puede
+# aparecer después de otra más reciente ya guardada. Se vuelve a pedir desde la marca menos
+# este margen (el mismo del planificador); las repetidas solo se actualizan.
+MARGEN_MARCA = pd.Timedelta(hours=12)
+
+
+def abrir_almacen(ruta):
+    """Abre (o crea) la base SQLite con sus tablas."""
+    con = sqlite3.connect(ruta, check_same_thread=False)
+    con.executescript("""
+        CREATE TABLE IF NOT EXISTS grabaciones (
+            id_interno TEXT NOT NULL,
+            id_grabacion TEXT NOT NULL,
+            nombre TEXT,
+            inicio TEXT,
+            duracion INTEGER,
+            link TEXT,
+            PRIMARY KEY (id_interno, id_grabacion)
+        );
+        CREATE TABLE IF NOT EXISTS marcas (
+            id_interno TEXT PRIMARY KEY,
+            ultima_grabacion TEXT,
+            actualizado TEXT,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+    """)
+    # Almacenes creados antes de la columna 'version'
+    if 'version' not in [c[1] for c in con.execute("PRAGMA table_info(marcas)")]:
+        con.execute("ALTER TABLE marcas ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    return con
+
+
+def obtener_marca(con, id_interno):
+    """Fecha (texto ISO de la API) desde la que hay que pedir grabaciones del curso."""
+    fila = con.execute("SELECT ultima_grabacion FROM marcas WHERE id_interno = ?", (id_interno,)).fetchone()
+    if not fila or not fila[0]:
+        return FECHA_INICIAL
+    try:
+        marca = pd.Timestamp(fila[0])
+    except ValueError:
+        return fila[0] # marca con otro formato: se usa tal cual
+    # La API entrega las horas en UTC ('Z'); una marca sin zona también se toma como UTC
+    marca = marca.tz_localize('UTC') if marca.tzinfo is None else marca.tz_convert('UTC')
+    return (marca - MARGEN_MARCA).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def obtener_actualizaciones(con):
+    """Fecha y hora (texto ISO local) de la última consulta exitosa de cada curso."""
+    return dict(con.execute("SELECT id_interno, actualizado FROM marcas WHERE actualizado IS NOT NULL").fetchall())
+
+
+def guardar_grabaciones(con, id_interno, grabaciones):
+    """Inserta/actualiza las grabaciones recibidas y mueve la marca de agua del curso.
+
+    La 'version' del curso sube solo si alguna grabación es nueva o cambió: el reporte
+    final reutiliza las filas de los cursos cuya versión sigue igual (cache_reporte).
+    """
+    antes = con.total_changes
+    con.executemany(
+        """INSERT INTO grabaciones (id_interno, id_grabacion, nombre, inicio, duracion, link)
+           VALUES (?, ?, ?, ?, ?, ?)
+           ON CONFLICT (id_interno, id_grabacion) DO UPDATE SET
+               nombre = excluded.nombre, inicio = excluded.inicio, duracion = excluded.duracion, link = excluded.link
+           WHERE nombre IS NOT excluded.nombre OR inicio IS NOT excluded.inicio
+              OR duracion IS NOT excluded.duracion OR link IS NOT excluded.link""",
+        [(id_interno, str(v.get('id')), v.get('mediaName'), v.get('startTime'), v.get('duration', 0), v.get('guestLink'))
+         for v in grabaciones]
+    )
+    cambios = con.total_changes - antes
+    # La marca es la grabación más reciente guardada (incluye las de corridas anteriores)
+    ultima = con.execute("SELECT MAX(inicio) FROM grabaciones WHERE id_interno = ?", (id_interno,)).fetchone()[0]
+    con.execute(
+        """INSERT INTO marcas (id_interno, ultima_grabacion, actualizado, version) VALUES (?, ?, ?, ?)
+           ON CONFLICT (id_interno) DO UPDATE SET
+               ultima_grabacion = excluded.ultima_grabacion, actualizado = excluded.actualizado,
+               version = version + excluded.version""",
+        (id_interno, ultima, datetime.now().isoformat(timespec='seconds'), 1 if cambios else 0)
+    )
+    con.commit()
+
+
+def leer_grabaciones(con, id_interno):
+    """Todas las grabaciones guardadas del curso, en el formato de la API (ordenadas por fecha)."""
+    filas = con.execute(
+        "SELECT id_grabacion, nombre, inicio, duracion, link FROM grabaciones WHERE id_interno = ? ORDER BY inicio",
+        (id_interno,)
+    ).fetchall()
+    return [{'id': f[0], 'mediaName': f[1], 'startTime': f[2], 'duration': f[3], 'guestLink': f[4]} for f in filas]
+
+
+def resumen_cursos(con, ids_internos, bloque=500):
+    """{id_interno: (cantidad de grabaciones, versión, marca de agua)} de esos cursos, sin cargar las grabaciones."""
+    resumen = {}
+    for i in range(0, len(ids_internos), bloque):
+        ids = ids_internos[i:i + bloque]
+        resumen.update((fila[0], fila[1:]) for fila in con.execute(
+            f"""SELECT m.id_interno, COUNT(g.id_grabacion), m.version, m.ultima_grabacion
+                FROM marcas m LEFT JOIN grabaciones g ON g.id_interno = m.id_interno
+                WHERE m.id_interno IN ({','.join('?' * len(ids))}) GROUP BY m.id_interno""", ids
+        ))
+    return resumen
+
+
+def leer_todas(con):
+    """Todas las grabaciones del almacén en un DataFrame (para la conciliación con la agenda)."""
+    return pd.read_sql_query(
+        "SELECT id_interno, id_grabacion, nombre, inicio, duracion, link FROM grabaciones", con
+    )
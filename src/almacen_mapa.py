@@ -0,0 +1,113 @@
+import sqlite3
+from datetime import datetime
+import pandas as pd
+
+# ==========================================
+# ALMACÉN LOCAL DEL MAPA DE LLAVES (SQLite)
+# ==========================================
+# Tabla 'cursos' con llave ID_Interno: cada corrida del script 02 solo inserta o
+# actualiza los cursos nuevos o que cambiaron (nombre, courseId). La tabla 'meta'
+# guarda la hora del último refresco completo y los IDs buscados sin resultado
+# (las cookies de la sesión van aparte, en un archivo con permisos restringidos).
+# base_maestra_ids.parquet (lo que leen el ETL y la conciliación) se exporta desde aquí.
+
+COLUMNAS_MAPA = ['ID', 'Nombre', 'ID_Interno', 'ID_Visible']
+
+
+def abrir_mapa(ruta):
+    """Abre (o crea) la base SQLite con sus tablas."""
+    con = sqlite3.connect(ruta, check_same_thread=False)
+    con.executescript("""
+        CREATE TABLE IF NOT EXISTS cursos (
+            id_interno TEXT PRIMARY KEY NOT NULL,
+            id TEXT,
+            nombre TEXT,
+            id_visible TEXT,
+            actualizado TEXT
+        );
+        CREATE INDEX IF NOT EXISTS cursos_por_id ON cursos (id);
+        CREATE TABLE IF NOT EXISTS meta (
+            clave TEXT PRIMARY KEY,
+            valor TEXT
+        );
+    """)
+    # Bases creadas antes del NOT NULL: filas sin llave que se volvían a insertar en cada corrida
+    con.execute("DELETE FROM cursos WHERE id_interno IS NULL")
+    # Bases anteriores guardaban las cookies de la sesión en texto plano aquí
+    con.execute("DELETE FROM meta WHERE clave = 'cookies'")
+    con.commit()
+    return con
+
+
+def leer_meta(con, clave):
+    fila = con.execute("SELECT valor FROM meta WHERE clave = ?", (clave,)).fetchone()
+    return fila[0] if fila else None
+
+
+def guardar_meta(con, clave, valor):
+    con.execute("INSERT OR REPLACE INTO meta (clave, valor) VALUES (?, ?)", (clave, valor))
+    con.commit()
+
+
+def ultima_actualizacion(con):
+    """Fecha y hora del último refresco completo (datetime) o None si nunca se hizo."""
+    valor = leer_meta(con, 'actualizado')
+    return datetime.fromisoformat(valor) if valor else None
+
+
+def marcar_actualizacion(con):
+    guardar_meta(con, 'actualizado', datetime.now().isoformat(timespec='seconds'))
+
+
+def leer_mapa(con):
+    """Todo el mapa en un DataFrame con las columnas de base_maestra_ids."""
+    return pd.read_sql_query(
+        "SELECT id AS ID, nombre AS Nombre, id_interno AS ID_Interno, id_visible AS ID_Visible FROM cursos ORDER BY rowid",
+        con
+    )
+
+
+def _leer_por_llave(con, ids_internos, bloque=500):
+    """Versión guardada de los cursos indicados (solo esos, no toda la tabla)."""
+    partes = []
+    for i in range(0, len(ids_internos), bloque):
+        ids = ids_internos[i:i + bloque]
+        partes.append(pd.read_sql_query(
+            "SELECT id_interno AS ID_Interno, id AS ID_ant, nombre AS Nombre_ant, id_visible AS ID_Visible_ant "
+            f"FROM cursos WHERE id_interno IN ({','.join('?' * len(ids))})",
+            con, params=ids
+        ))
+    return pd.concat(partes, ignore_index=True)
+
+
+def _distinto(a, b):
+    """Comparación fila a fila donde dos vacíos cuentan como iguales."""
+    return a.ne(b) & ~(a.isna() & b.isna())
+
+
+def guardar_cursos(con, df):
+    """Upsert de los cursos de df (columnas COLUMNAS_MAPA). Devuelve (nuevos, cambiados).
+
+    Solo se escriben las filas que no existen o cuyo ID, Nombre o ID_Visible cambió.
+    Las filas sin ID_Interno se descartan (no se pueden ubicar en la tabla).
+    """
+    df = df[COLUMNAS_MAPA].dropna(subset=['ID_Interno'])
+    if df.empty:
+        return 0, 0
+    df = df.drop_duplicates('ID_Interno').astype(object)
+    df = df.where(df.notna(), None) # sqlite3 no acepta pd.NA
+    actuales = _leer_por_llave(con, df['ID_Interno'].tolist())
+    cruce = df.merge(actuales, on='ID_Interno', how='left', indicator=True)
+    nuevos = cruce['_merge'] == 'left_only'
+    cambiados = ~nuevos & (
+        _distinto(cruce['ID'], cruce['ID_ant']) | _distinto(cruce['Nombre'], cruce['Nombre_ant'])
+        | _distinto(cruce['ID_Visible'], cruce['ID_Visible_ant'])
+    )
+    ahora = datetime.now().isoformat(timespec='seconds')
+    filas = cruce[nuevos | cambiados]
+    con.executemany(
+        "INSERT OR REPLACE INTO cursos (id_interno, id, nombre, id_visible, actualizado) VALUES (?, ?, ?, ?, ?)",
+        [(f.ID_Interno, f.ID, f.Nombre, f.ID_Visible, ahora) for f in filas.itertuples(index=False)]
+    )
+    con.commit()
+    return int(nuevos.sum()), int(cambiados.sum())
@@ -0,0 +1,64 @@
+import json
+import time
+import sqlite3
+import hashlib
+
+# ==========================================
+# CACHÉ DE FILAS DEL REPORTE (POR CONTENIDO, LRU)
+# ==========================================
+# El reporte final se arma cada vez con el historial completo de cada curso, aunque
+# casi ningún curso cambie entre corridas. Aquí se guardan las filas ya transformadas
+# de cada curso bajo una huella (hash) de lo que las define: datos del curso + el
+# estado de sus grabaciones en el almacén (cantidad, marca de agua y 'version', que
+# sube solo cuando alguna grabación es nueva o cambió). La huella se calcula sin leer
+# las grabaciones: si no cambió, se reutilizan las filas sin tocar el almacén ni
+# volver a parsear. Un curso que cambia genera otra huella; las viejas se descartan
+# por antigüedad de uso cuando la caché supera MAX_ENTRADAS (LRU).
+
+# Cambiar este número invalida todas las filas guardadas (p. ej. si cambian las columnas)
+VERSION_FILAS = 2
+MAX_ENTRADAS = 20000
+
+
+def abrir_cache_reporte(ruta):
+    """Abre (o crea) la base SQLite de la caché."""
+    con = sqlite3.connect(ruta)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS filas (
+            huella TEXT PRIMARY KEY,
+            filas TEXT NOT NULL,
+            usado REAL NOT NULL
+        )
+    """)
+    return con
+
+
+def huella(curso, estado):
+    """Hash de lo que define las filas del curso en el reporte (estado: de almacen_grabaciones.resumen_cursos)."""
+    contenido = json.dumps([VERSION_FILAS, curso['ID_Interno'], *estado, curso['ID'], curso['Curso'], curso['Docente']],
+                           ensure_ascii=False, default=str)
+    return hashlib.blake2b(contenido.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def leer_filas(con, huellas, bloque=500):
+    """{huella: filas} de las huellas que están en la caché; las marca como recién usadas."""
+    encontradas = {}
+    for i in range(0, len(huellas), bloque):
+        parte = huellas[i:i + bloque]
+        marcas = ','.join('?' * len(parte))
+        encontradas.update(
+            (h, json.loads(f)) for h, f in con.execute(f"SELECT huella, filas FROM filas WHERE huella IN ({marcas})", parte)
+        )
+        con.execute(f"UPDATE filas SET usado = ? WHERE huella IN ({marcas})", [time.time(), *parte])
+    con.commit()
+    return encontradas
+
+
+def guardar_filas(con, nuevas, maximo=MAX_ENTRADAS):
+    """Guarda {huella: filas} y descarta las entradas usadas hace más tiempo si se pasa del máximo."""
+    ahora = time.time()
+    con.executemany("INSERT OR REPLACE INTO filas (huella, filas, usado) VALUES (?, ?, ?)",
+                    [(h, json.dumps(f, ensure_ascii=False), ahora) for h, f in nuevas.items()])
+    con.execute("DELETE FROM filas WHERE huella IN (SELECT huella FROM filas ORDER BY usado DESC LIMIT -1 OFFSET ?)",
+                (maximo,))
+    con.commit()
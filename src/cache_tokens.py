@@ -0,0 +1,64 @@
+import base64
+import json
+import os
+import time
+
+# ==========================================
+# CACHÉ DE TOKENS DE COLLABORATE
+# ==========================================
+# Guarda en disco el último token Bearer de cada curso (llave: ID_Interno).
+# El token es un JWT: su campo 'exp' dice hasta cuándo sirve, así que no hace falta
+# volver a abrir Chrome mientras siga vigente.
+
+# Margen de seguridad: un token que vence en menos de 1 minuto se considera vencido
+MARGEN_SEGUNDOS = 60
+
+
+def leer_expiracion(token):
+    """Devuelve el 'exp' (segundos epoch) del JWT, o None si no se puede leer."""
+    try:
+        jwt = token.replace("Bearer", "").strip()
+        payload = jwt.split('.')[1] # header.payload.firma
+        payload += '=' * (-len(payload) % 4) # base64 exige longitud múltiplo de 4
+        datos = json.loads(base64.urlsafe_b64decode(payload))
+        return int(datos['exp'])
+    except Exception:
+        return None
+
+
+def cargar_cache(ruta):
+    """Lee el archivo de caché; si no existe o está dañado, empieza vacío."""
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def guardar_cache(ruta, cache):
+    """Guarda solo los tokens que siguen vigentes."""
+    vigentes = {k: v for k, v in cache.items() if v.get('exp', 0) > time.time() + MARGEN_SEGUNDOS}
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(vigentes, f, indent=2)
+
+
+def token_vigente(cache, id_interno):
+    """Devuelve el token guardado del curso si todavía no vence, si no None."""
+    entrada = cache.get(id_interno)
+    if entrada and entrada.get('exp', 0) > time.time() + MARGEN_SEGUNDOS:
+        return entrada['token']
+    return None
+
+
+def registrar_token(cache, id_interno, token):
+    """Agrega el token capturado por el navegador (si trae 'exp' legible)."""
+    exp = leer_expiracion(token)
+    if exp:
+        cache[id_interno] = {'token': token, 'exp': exp}
+
+
+def descartar_token(cache, id_interno):
+    """Quita un token que la API rechazó (401)."""
+    cache.pop(id_interno, None)
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import pandas as pd
+
+# ==========================================
+# CARGA RÁPIDA DEL PANEL DE PROGRAMACIÓN
+# ==========================================
+# 1) Si el panel no cambió desde la última corrida (tamaño, fecha de modificación y hash),
+#    se reutiliza la tabla ya leída y no se copia ni se abre el Excel.
+# 2) Si cambió, se leen SOLO las columnas necesarias en modo streaming (read_only)
+#    en vez de cargar la hoja completa con pd.read_excel.
+
+
+def _hash_archivo(ruta, bloque=1024 * 1024):
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for trozo in iter(lambda: f.read(bloque), b''):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def revisar_cambios(ruta, ruta_firma):
+    """Compara el panel con la firma de la última lectura.
+
+    Devuelve (sin_cambios, firma_actual). El hash solo se calcula si tamaño y
+    fecha coinciden (si no coinciden, el archivo cambió seguro).
+    """
+    info = os.stat(ruta)
+    firma = {'tamano': info.st_size, 'mtime': info.st_mtime}
+
+    anterior = {}
+    if os.path.exists(ruta_firma):
+        try:
+            with open(ruta_firma, 'r', encoding='utf-8') as f:
+                anterior = json.load(f)
+        except (OSError, ValueError):
+            anterior = {}
+
+    if anterior.get('tamano') != firma['tamano'] or anterior.get('mtime') != firma['mtime']:
+        return False, firma
+
+    firma['sha256'] = _hash_archivo(ruta)
+    return anterior.get('sha256') == firma['sha256'], firma
+
+
+def cargar_cache(ruta_cache):
+    """Tabla del panel guardada en la corrida anterior (pickle conserva tipos mezclados de Excel)."""
+    return pd.read_pickle(ruta_cache)
+
+
+def guardar_cache(df, firma, ruta_origen, ruta_cache, ruta_firma):
+    """Guarda la tabla leída y la firma del panel para la próxima corrida."""
+    if 'sha256' not in firma:
+        firma = dict(firma, sha256=_hash_archivo(ruta_origen))
+    df.to_pickle(ruta_cache)
+    with open(ruta_firma, 'w', encoding='utf-8') as f:
+        json.dump(firma, f, indent=2)
+
+
+def leer_columnas(ruta, hoja, fila_encabezado, columnas):
+    """Lee solo 'columnas' de la hoja, con el encabezado en la fila 'fila_encabezado' (1 = primera).
+
+    Usa python-calamine si está instalado (lector en Rust); si no, openpyxl en modo read_only.
+    """
+    try:
+        import python_calamine # noqa: F401  (opcional, más rápido)
+        return pd.read_excel(ruta, sheet_name=hoja, header=fila_encabezado - 1, engine='calamine',
+                             usecols=lambda c: c in columnas)
+    except ImportError:
+        pass
+
+    from openpyxl import load_workbook
+    wb = load_workbook(ruta, read_only=True, data_only=True) # read_only = lectura por streaming
+    try:
+        ws = wb[hoja]
+        encabezado = next(ws.iter_rows(min_row=fila_encabezado, max_row=fila_encabezado, values_only=True))
+        posiciones = {}
+        for i, nombre in enumerate(encabezado):
+            if nombre in columnas and nombre not in posiciones: # si una columna se repite, vale la primera (igual que pandas)
+                posiciones[nombre] = i
+        if not posiciones:
+            return pd.DataFrame(columns=[])
+
+        # Solo se recorre el tramo de columnas que contiene a las que nos interesan
+        col_min, col_max = min(posiciones.values()), max(posiciones.values())
+        nombres = list(posiciones)
+        indices = [posiciones[n] - col_min for n in nombres]
+        filas = []
+        for fila in ws.iter_rows(min_row=fila_encabezado + 1, min_col=col_min + 1, max_col=col_max + 1, values_only=True):
+            valores = [fila[i] if i < len(fila) else None for i in indices]
+            if any(v is not None for v in valores): # se ignoran filas vacías al final de la hoja
+                filas.append(valores)
+    finally:
+        wb.close()
+    return pd.DataFrame(filas, columns=nombres)
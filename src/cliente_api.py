@@ -0,0 +1,162 @@
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+
+# ==========================================
+# CLIENTE DE LA API DE COLLABORATE (LIMITADOR + REINTENTOS)
+# ==========================================
+# Todos los hilos piden permiso a un mismo "balde de fichas" antes de llamar a la API.
+# La tasa se adapta sola: crece rápido (x1.05 por respuesta) hasta el primer 429, luego
+# sube poco a poco (+0.2 req/s) y se reduce a la mitad ante un 429, respetando el
+# Retry-After del servidor. Los 429, 5xx y errores de conexión se reintentan con
+# espera exponencial con jitter.
+
+TASA_INICIAL = 10.0 # peticiones por segundo al arrancar
+TASA_MINIMA = 0.5
+TASA_MAXIMA = 100.0
+FACTOR_ARRANQUE = 1.05 # crecimiento por respuesta correcta mientras no haya habido 429
+AUMENTO_POR_EXITO = 0.2 # +0.2 req/s por respuesta correcta después del primer 429
+VENTANA_RECORTE = 1.0 # los 429 de una misma ráfaga recortan la tasa una sola vez
+MAX_INTENTOS = 5
+ESPERA_BASE = 0.5 # segundos (0.5, 1, 2, 4... con jitter)
+ESPERA_MAXIMA = 30.0
+
+# Respuestas que vale la pena reintentar (el resto se devuelve tal cual)
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+class LimitadorAdaptativo:
+    """Balde de fichas compartido entre hilos con tasa adaptable (arranque rápido, luego aumento aditivo y baja multiplicativa)."""
+
+    def __init__(self, tasa=TASA_INICIAL, tasa_minima=TASA_MINIMA, tasa_maxima=TASA_MAXIMA):
+        self.tasa = tasa
+        self.tasa_minima = tasa_minima
+        self.tasa_maxima = tasa_maxima
+        self.fichas = 1.0
+        self.ultima_recarga = time.monotonic()
+        self.pausa_hasta = 0.0 # Retry-After: nadie llama a la API antes de esta hora
+        self.arranque = True # hasta el primer 429 la tasa crece en forma multiplicativa
+        self.ultimo_recorte = float('-inf')
+        self._candado = threading.Lock()
+
+    def esperar(self):
+        """Bloquea hasta que haya una ficha disponible (y haya terminado cualquier pausa)."""
+        while True:
+            with self._candado:
+                ahora = time.monotonic()
+                if ahora >= self.pausa_hasta:
+                    # Se recargan las fichas según el tiempo pasado (máximo 1 s de ráfaga)
+                    self.fichas = min(max(self.tasa, 1.0), self.fichas + (ahora - self.ultima_recarga) * self.tasa)
+                    self.ultima_recarga = ahora
+                    if self.fichas >= 1:
+                        self.fichas -= 1
+                        return
+                    espera = (1 - self.fichas) / self.tasa
+                else:
+                    espera = self.pausa_hasta - ahora
+            time.sleep(espera)
+
+    def exito(self):
+        with self._candado:
+            nueva = self.tasa * FACTOR_ARRANQUE if self.arranque else self.tasa + AUMENTO_POR_EXITO
+            self.tasa = min(self.tasa_maxima, nueva)
+
+    def limitado(self, retry_after=None):
+        """El servidor respondió 429: la tasa baja a la mitad y, si lo pidió, todos esperan."""
+        with self._candado:
+            ahora = time.monotonic()
+            self.arranque = False
+            if ahora - self.ultimo_recorte >= VENTANA_RECORTE:
+                self.tasa = max(self.tasa_minima, self.tasa / 2)
+                self.ultimo_recorte = ahora
+            self.fichas = 0.0
+            if retry_after:
+                self.pausa_hasta = max(self.pausa_hasta, ahora + retry_after)
+
+
+def leer_retry_after(valor):
+    """Segundos de la cabecera Retry-After (número o fecha HTTP). None si no viene o no se entiende."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(valor) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def espera_con_jitter(intento):
+    """Espera exponencial con 'full jitter': al azar entre 0 y base * 2^intento (con tope)."""
+    return random.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** intento))
+
+
+class ClienteAPI:
+    """GET (y POST) con limitador de tasa y reintentos sobre una requests.Session compartida."""
+
+    def __init__(self, sesion, limitador=None, max_intentos=MAX_INTENTOS):
+        self.sesion = sesion
+        self.limitador = limitador or LimitadorAdaptativo()
+        self.max_intentos = max_intentos
+        self.stats = {'peticiones': 0, 'reintentos': 0, 'limitadas': 0}
+        self._candado = threading.Lock()
+
+    def _contar(self, clave):
+        with self._candado:
+            self.stats[clave] += 1
+
+    def get(self, url, **kwargs):
+        """Devuelve la última respuesta (puede ser un 429/5xx si se agotan los intentos).
+
+        Lanza la última excepción de conexión si ningún intento llegó al servidor.
+        """
+        for intento in range(self.max_intentos):
+            if intento:
+                self._contar('reintentos')
+            self.limitador.esperar()
+            self._contar('peticiones')
+            try:
+                resp = self.sesion.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if intento == self.max_intentos - 1:
+                    raise
+                time.sleep(espera_con_jitter(intento))
+                continue
+
+            if resp.status_code not in ESTADOS_REINTENTABLES:
+                self.limitador.exito()
+                return resp
+
+            if resp.status_code == 429:
+                self._contar('limitadas')
+                retry_after = leer_retry_after(resp.headers.get('Retry-After'))
+                self.limitador.limitado(retry_after)
+                if retry_after is not None:
+                    continue # el limitador ya hace esperar a todos los hilos
+            if intento < self.max_intentos - 1:
+                time.sleep(espera_con_jitter(intento))
+        return resp
+
+    def post(self, url, **kwargs):
+        """Un solo POST respetando el limitador (sin reintentos: un formulario reenviado repite su nonce).
+
+        Si falla, quien llama rehace la operación completa (p. ej. el lanzamiento LTI con un formulario nuevo).
+        """
+        self.limitador.esperar()
+        self._contar('peticiones')
+        resp = self.sesion.post(url, **kwargs)
+        if resp.status_code == 429:
+            self._contar('limitadas')
+            self.limitador.limitado(leer_retry_after(resp.headers.get('Retry-After')))
+        elif resp.status_code not in ESTADOS_REINTENTABLES:
+            self.limitador.exito()
+        return resp
+
+    def resumen(self):
+        return (f"🚦 API: {self.stats['peticiones']} peticiones | {self.stats['reintentos']} reintentos | "
+                f"{self.stats['limitadas']} respuestas 429 | tasa final {self.limitador.tasa:.1f} req/s")
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# CONCILIACIÓN SESIONES <-> GRABACIONES (VECTORIZADA)
+# ==========================================
+# Reemplaza el cruce manual en Excel entre la agenda (supervisar_clases) y el reporte
+# de grabaciones: cada grabación se asigna a la sesión de su curso (ID) cuyo inicio
+# está más cerca, con merge_asof (by='ID', tolerancia de tiempo). Luego se cuenta por
+# sesión y se marcan las que no tienen grabación, las cortas y las duplicadas.
+
+# Las sesiones del panel están en hora de Lima; la API entrega startTime en UTC
+ZONA_HORARIA = "America/Lima"
+
+# Diferencia máxima entre el inicio programado y el inicio de la grabación
+TOLERANCIA = pd.Timedelta(minutes=90)
+
+# Una grabación es "corta" si dura menos de esta fracción de la sesión programada
+FRACCION_CORTA = 0.5
+# ...o menos que esto si la sesión no tiene hora de fin
+MINUTOS_CORTA = 20
+
+SIN_GRABACION = 'SIN GRABACIÓN'
+CORTA = 'CORTA'
+DUPLICADA = 'DUPLICADA'
+PENDIENTE = 'PENDIENTE' # la sesión todavía no termina
+OK = 'OK'
+
+
+def _hora(df, columna):
+    """datetime.time -> Timedelta desde la medianoche (NaT si falta)."""
+    return pd.to_timedelta(df[columna].astype('string'), errors='coerce')
+
+
+def preparar_sesiones(df_agenda):
+    """Agenda con inicio/fin como fecha y hora completas y duración programada (min)."""
+    sesiones = df_agenda.reset_index(drop=True).copy()
+    sesiones['sesion'] = np.arange(len(sesiones)) # llave de cada sesión
+    sesiones['ID'] = sesiones['ID'].astype(str)
+    fechas = pd.to_datetime(sesiones['FECHAS'], errors='coerce').dt.normalize()
+    sesiones['inicio'] = fechas + _hora(sesiones, 'HORA_INICIO')
+    sesiones['fin'] = fechas + _hora(sesiones, 'HORA_FIN')
+    sesiones['Duración programada (min)'] = (sesiones['fin'] - sesiones['inicio']).dt.total_seconds() / 60
+    return sesiones
+
+
+def preparar_grabaciones(df_grabaciones, mapa_ids):
+    """Grabaciones del almacén con su ID (PERIODO.NRC) y el inicio en hora local.
+
+    mapa_ids: DataFrame con columnas ID e ID_Interno.
+    """
+    grab = df_grabaciones.merge(
+        mapa_ids[['ID', 'ID_Interno']].drop_duplicates('ID_Interno').rename(columns={'ID_Interno': 'id_interno'}),
+        on='id_interno', how='left'
+    )
+    grab['ID'] = grab['ID'].astype(str)
+    # Un solo parseo vectorizado para todas las grabaciones (UTC -> Lima, sin zona para cruzar con la agenda)
+    grab['inicio_grabacion'] = pd.to_datetime(grab['inicio'], utc=True, errors='coerce') \
+        .dt.tz_convert(ZONA_HORARIA).dt.tz_localize(None)
+    # pd.to_numeric: con el almacén vacío read_sql_query devuelve columnas object
+    grab['Duración grabada (min)'] = (pd.to_numeric(grab['duracion'], errors='coerce').fillna(0) / 60000).round(1)
+    return grab
+
+
+def conciliar(df_agenda, df_grabaciones, mapa_ids, ahora=None, tolerancia=TOLERANCIA):
+    """Devuelve (sesiones, grabaciones_sin_sesion).
+
+    sesiones: una fila por sesión de la agenda con la cantidad de grabaciones asignadas,
+    la duración grabada, el link y el estado (OK, SIN GRABACIÓN, CORTA, DUPLICADA, PENDIENTE).
+    grabaciones_sin_sesion: grabaciones que no caen cerca de ninguna sesión de su curso.
+    """
+    ahora = pd.Timestamp.now() if ahora is None else ahora
+    sesiones = preparar_sesiones(df_agenda)
+    grab = preparar_grabaciones(df_grabaciones, mapa_ids)
+
+    # merge_asof exige ambas tablas ordenadas por la columna de tiempo
+    izquierda = grab.dropna(subset=['inicio_grabacion']).sort_values('inicio_grabacion')
+    derecha = sesiones.dropna(subset=['inicio'])[['sesion', 'ID', 'inicio']] \
+        .rename(columns={'inicio': 'inicio_sesion'}).sort_values('inicio_sesion')
+    asignadas = pd.merge_asof(
+        izquierda, derecha, left_on='inicio_grabacion', right_on='inicio_sesion', by='ID',
+        direction='nearest', tolerance=tolerancia
+    )
+
+    # --- Resumen por sesión ---
+    con_sesion = asignadas.dropna(subset=['sesion']).astype({'sesion': int})
+    por_sesion = con_sesion.groupby('sesion').agg(**{
+        'Grabaciones': ('id_grabacion', 'size'),
+        'Duración grabada (min)': ('Duración grabada (min)', 'sum'),
+        'Inicio grabación': ('inicio_grabacion', 'first'),
+        'Link': ('link', 'first'),
+    })
+    sesiones = sesiones.merge(por_sesion, left_on='sesion', right_index=True, how='left')
+    sesiones['Grabaciones'] = sesiones['Grabaciones'].fillna(0).astype(int)
+
+    # --- Estado (el orden de las condiciones define la prioridad) ---
+    programada = sesiones['Duración programada (min)']
+    umbral = programada.where(programada > 0) * FRACCION_CORTA
+    umbral = umbral.fillna(MINUTOS_CORTA)
+    terminada = sesiones['fin'].fillna(sesiones['inicio']) <= ahora
+    sesiones['Estado conciliación'] = np.select(
+        [sesiones['Grabaciones'] > 1,
+         (sesiones['Grabaciones'] == 1) & (sesiones['Duración grabada (min)'] < umbral),
+         sesiones['Grabaciones'] == 1,
+         terminada],
+        [DUPLICADA, CORTA, OK, SIN_GRABACION],
+        default=PENDIENTE
+    )
+
+    sin_sesion = asignadas[asignadas['sesion'].isna()]
+    return sesiones, sin_sesion
+
+
+def contar_estados(sesiones):
+    """Cantidad de sesiones por estado (para el resumen en consola)."""
+    return sesiones['Estado conciliación'].value_counts()
@@ -0,0 +1,164 @@
+import os
+import csv
+import datetime
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+# ==========================================
+# EXPORTACIÓN A EXCEL EN STREAMING (MEMORIA CONSTANTE)
+# ==========================================
+# pd.ExcelWriter + to_excel guarda todas las celdas en memoria hasta cerrar el archivo.
+# Aquí el libro se abre en modo 'constant_memory' de xlsxwriter: cada fila se escribe
+# al disco apenas se pasa a la siguiente, así la memoria no crece con el tamaño del
+# reporte y el tiempo crece en forma lineal. Se conserva lo que hacían los scripts:
+# tabla con estilo 'TableStyleMedium2', encabezado de pandas, fechas dd/mm/yyyy, links
+# clicables y anchos/formatos de columna (set_column). Opcionalmente escribe un .csv
+# con las mismas filas en la misma pasada.
+#
+# Uso:
+#   with LibroExcel(ruta) as libro:
+#       tabla = libro.agregar_tabla('Reporte', columnas, filas=n, nombre_tabla='TablaReporte')
+#       tabla.hoja.set_column('B:B', 30)
+#       for lote in lotes:
+#           tabla.escribir_df(lote)
+
+ESTILO_TABLA = 'TableStyleMedium2'
+FORMATO_FECHA = 'dd/mm/yyyy'
+# Mismo formato que pandas usa para los encabezados
+FORMATO_ENCABEZADO = {'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}
+
+
+class TablaExcel:
+    """Hoja con una tabla de Excel que se llena fila por fila (en orden)."""
+
+    def __init__(self, libro, hoja, columnas, filas=None, nombre_tabla=None, formatos_fecha=None, ruta_csv=None):
+        self.hoja = libro.workbook.add_worksheet(hoja)
+        self.columnas = list(columnas)
+        self.filas = 0
+        self.filas_declaradas = filas
+        # Formato de fecha propio por columna (el resto usa FORMATO_FECHA del libro)
+        self._formatos_fecha = {
+            self.columnas.index(c): libro.workbook.add_format({'num_format': f})
+            for c, f in (formatos_fecha or {}).items() if c in self.columnas
+        }
+
+        if nombre_tabla:
+            self._declarar_tabla(libro, nombre_tabla, filas)
+        # El encabezado se (re)escribe con el modo ya restablecido
+        self.hoja.write_row(0, 0, self.columnas, libro.workbook.add_format(FORMATO_ENCABEZADO))
+
+        self._archivo_csv = None
+        if ruta_csv:
+            # utf-8-sig: Excel abre bien las tildes del CSV
+            self._archivo_csv = open(ruta_csv, 'w', encoding='utf-8-sig', newline='')
+            self._csv = csv.writer(self._archivo_csv)
+            self._csv.writerow(self.columnas)
+
+    def _declarar_tabla(self, libro, nombre_tabla, filas):
+        """Tabla de Excel sobre el rango completo (filas = cantidad de filas de datos, conocida de antemano).
+
+        xlsxwriter no acepta add_table() en modo constant_memory (devuelve -3). Como todavía no se
+        escribió ninguna celda de la hoja, se apaga el modo solo para esa llamada. OJO: esto depende
+        del atributo interno Worksheet.constant_memory, probado con xlsxwriter 3.2.9 (la versión fijada
+        en requirements.txt). Si una versión nueva lo cambia, la hoja se escribe igual, sin tabla.
+        """
+        if not hasattr(self.hoja, 'constant_memory'):
+            print(f"⚠️ Hoja '{self.hoja.name}': esta versión de xlsxwriter no permite declarar la tabla; se escribe sin tabla.")
+            return
+        self.hoja.constant_memory = False
+        try:
+            resultado = self.hoja.add_table(0, 0, max(filas, 1), len(self.columnas) - 1, {
+                'columns': [{'header': c} for c in self.columnas],
+                'style': ESTILO_TABLA,
+                'name': nombre_tabla
+            })
+        finally:
+            self.hoja.constant_memory = libro.constant_memory
+        if resultado != 0: # add_table() devuelve 0 si se creó la tabla
+            print(f"⚠️ Hoja '{self.hoja.name}': no se pudo declarar la tabla {nombre_tabla} (código {resultado}); se escribe sin tabla.")
+
+    def _escribir_celda(self, fila, col, valor):
+        if valor is None or valor is pd.NaT or valor is pd.NA or (isinstance(valor, float) and valor != valor):
+            return # celda vacía, igual que pandas
+        if isinstance(valor, np.generic):
+            valor = valor.item()
+        if isinstance(valor, (datetime.datetime, datetime.date)):
+            self.hoja.write_datetime(fila, col, valor, self._formatos_fecha.get(col))
+        elif isinstance(valor, datetime.time):
+            self.hoja.write_string(fila, col, str(valor)) # pandas escribe las horas como texto
+        elif isinstance(valor, datetime.timedelta):
+            self.hoja.write_number(fila, col, valor.total_seconds() / 86400)
+        elif isinstance(valor, (bool, int, float, str)):
+            self.hoja.write(fila, col, valor) # write() convierte los textos con http... en links
+        else:
+            self.hoja.write_string(fila, col, str(valor))
+
+    def escribir_fila(self, valores):
+        self.filas += 1
+        for col, valor in enumerate(valores):
+            self._escribir_celda(self.filas, col, valor)
+        if self._archivo_csv:
+            self._csv.writerow([_texto_csv(v) for v in valores])
+
+    def escribir_df(self, df):
+        """Escribe las filas del DataFrame (en el orden de self.columnas)."""
+        for valores in df[self.columnas].itertuples(index=False, name=None):
+            self.escribir_fila(valores)
+
+    def cerrar(self):
+        if self._archivo_csv:
+            self._archivo_csv.close()
+        if self.filas_declaradas is not None and self.filas != self.filas_declaradas:
+            print(f"⚠️ Hoja '{self.hoja.name}': {self.filas} filas escritas, {self.filas_declaradas} declaradas para la tabla.")
+
+
+def _texto_csv(valor):
+    if valor is None or valor is pd.NaT or valor is pd.NA or (isinstance(valor, float) and valor != valor):
+        return ''
+    if isinstance(valor, datetime.datetime) and valor.time() == datetime.time(0):
+        return valor.date().isoformat()
+    return valor
+
+
+class LibroExcel:
+    """Libro xlsxwriter en modo constant_memory. Se escribe en un archivo temporal y reemplaza
+    al anterior solo si todo terminó bien (un corte a mitad no deja el reporte dañado)."""
+
+    def __init__(self, ruta, formato_fecha=FORMATO_FECHA, constant_memory=True):
+        self.ruta = ruta
+        self.temporal = ruta + '.tmp'
+        self.constant_memory = constant_memory
+        self.workbook = xlsxwriter.Workbook(self.temporal, {
+            'constant_memory': constant_memory,
+            'default_date_format': formato_fecha,
+            'remove_timezone': True,
+        })
+        self.tablas = []
+
+    def agregar_tabla(self, hoja, columnas, filas=None, nombre_tabla=None, formatos_fecha=None, ruta_csv=None):
+        tabla = TablaExcel(self, hoja, columnas, filas, nombre_tabla, formatos_fecha, ruta_csv)
+        self.tablas.append(tabla)
+        return tabla
+
+    def agregar_df(self, hoja, df, nombre_tabla=None, formatos_fecha=None):
+        """Atajo para un DataFrame que ya está en memoria: hoja + tabla + filas."""
+        tabla = self.agregar_tabla(hoja, df.columns, len(df), nombre_tabla, formatos_fecha)
+        tabla.escribir_df(df)
+        return tabla
+
+    def formato(self, propiedades):
+        return self.workbook.add_format(propiedades)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        for tabla in self.tablas:
+            tabla.cerrar()
+        self.workbook.close()
+        if tipo is None:
+            os.replace(self.temporal, self.ruta)
+        elif os.path.exists(self.temporal):
+            os.remove(self.temporal)
+        return False
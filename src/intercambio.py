@@ -0,0 +1,78 @@
+import pandas as pd
+
+# ==========================================
+# INTERCAMBIO ENTRE SCRIPTS (PARQUET)
+# ==========================================
+# Los scripts se pasan los datos en Parquet con un esquema fijo: se lee y escribe
+# mucho más rápido que Excel y los IDs siguen siendo texto sin tener que forzarlos
+# con dtype={'ID': str}. Los .xlsx quedan solo como vista para las personas.
+
+ESQUEMAS = {
+    # 02_mapa_llaves -> 01_etl_programacion
+    'mapa_ids': {
+        'ID': 'string',
+        'Nombre': 'string',
+        'ID_Interno': 'string',
+        'ID_Visible': 'string',
+    },
+    # 01_etl_programacion -> 03_bot_scraper
+    'resumen_con_llave': {
+        'SOPORTE': 'string',
+        'ID': 'string',
+        'CURSO': 'string',
+        'DOCENTE': 'string',
+        'ESTADO_CURSO': 'string',
+        'Total Sesiones': 'int64',
+        'ID_Interno': 'string',
+    },
+    # Agenda operativa (hoja 'operativo' de supervisar_clases.xlsx)
+    'supervisar_clases': {
+        'SOPORTE': 'string',
+        'CURSO': 'string',
+        'DOCENTE': 'string',
+        'PERIODO': 'string', # en el panel hay celdas numéricas y de texto ('202510-B')
+        'NRC': 'string',
+        'ID': 'string',
+        'SESIÓN': 'string',
+        'FECHAS': 'datetime64[ns]',
+        'HORA_INICIO': 'object', # datetime.time -> time64 en Parquet
+        'HORA_FIN': 'object',
+        'ESTADO DE CLASE': 'string',
+        'ESTADO_CURSO': 'string',
+    },
+}
+
+
+def _a_texto(serie):
+    # astype(str) convertiría NaN en 'nan': se respetan los vacíos
+    return serie.where(serie.isna(), serie.astype(str)).astype('string')
+
+
+def _aplicar_esquema(df, nombre):
+    tipos = {c: t for c, t in ESQUEMAS[nombre].items() if c in df.columns}
+    for col, tipo in tipos.items():
+        if tipo == 'string' and df[col].dtype != 'string':
+            df[col] = _a_texto(df[col])
+        elif tipo == 'object':
+            # Horas (datetime.time): los NaT pasan a None para que Parquet los guarde como nulos
+            df[col] = df[col].astype('object').where(df[col].notna(), None)
+        else:
+            df[col] = df[col].astype(tipo)
+    # Columnas fuera del esquema: si mezclan tipos (número y texto en la misma columna),
+    # Parquet no las puede guardar; se pasan a texto
+    for col in df.columns.difference(list(tipos)):
+        if df[col].dtype == 'object' and df[col].dropna().map(type).nunique() > 1:
+            df[col] = _a_texto(df[col])
+    return df
+
+
+def guardar_tabla(df, ruta, nombre):
+    """Guarda el DataFrame en Parquet aplicando el esquema ESQUEMAS[nombre]."""
+    df = _aplicar_esquema(df.copy(), nombre)
+    df.to_parquet(ruta, index=False, engine='pyarrow')
+
+
+def leer_tabla(ruta, nombre, columnas=None):
+    """Lee un Parquet del pipeline con los tipos de su esquema."""
+    df = pd.read_parquet(ruta, columns=columnas, engine='pyarrow')
+    return _aplicar_esquema(df, nombre)
@@ -0,0 +1,109 @@
+import os
+import glob
+from sesion_http import URL_BLACKBOARD, sesion_valida
+
+# ==========================================
+# ARRANQUE RÁPIDO DE CHROME (DRIVER EN CACHÉ + PERFIL PERSISTENTE)
+# ==========================================
+# ChromeDriverManager().install() consulta por red la versión de Chrome en cada arranque.
+# Aquí la ruta del chromedriver se resuelve sin red: variable CHROMEDRIVER, la ruta
+# guardada en la corrida anterior o la caché de webdriver-manager (~/.wdm). Solo si no
+# hay ninguno (o Chrome se actualizó y ya no es compatible) se descarga de nuevo.
+# Cada Chrome usa un perfil persistente (--user-data-dir): si la sesión de Blackboard
+# sigue vigente, se recupera sola y no hace falta el login manual.
+# selenium / selenium-wire se importan aquí adentro, solo cuando de verdad se abre un navegador.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ARCHIVO_RUTA_DRIVER = os.path.join(BASE_DIR, "01_data", "chromedriver.txt")
+DIR_PERFILES = os.path.join(BASE_DIR, "01_data", "perfiles_chrome")
+CACHE_WDM = os.path.join(os.path.expanduser("~"), ".wdm", "drivers", "chromedriver")
+
+URL_LOGIN = "https://upn-colaborador.blackboard.com/"
+
+
+def _ejecutable(ruta):
+    return bool(ruta) and os.path.isfile(ruta) and os.access(ruta, os.X_OK)
+
+
+def ruta_chromedriver():
+    """Ruta de un chromedriver ya descargado (sin red) o None si no hay ninguno."""
+    ruta = os.getenv("CHROMEDRIVER")
+    if _ejecutable(ruta):
+        return ruta
+    if os.path.exists(ARCHIVO_RUTA_DRIVER):
+        with open(ARCHIVO_RUTA_DRIVER, 'r', encoding='utf-8') as f:
+            ruta = f.read().strip()
+        if _ejecutable(ruta):
+            return ruta
+    # Lo que dejó webdriver-manager en corridas anteriores: el más reciente
+    candidatos = [r for r in glob.glob(os.path.join(CACHE_WDM, "**", "chromedriver*"), recursive=True)
+                  if os.path.basename(r) in ("chromedriver", "chromedriver.exe") and _ejecutable(r)]
+    return max(candidatos, key=os.path.getmtime) if candidatos else None
+
+
+def instalar_chromedriver():
+    """Descarga (con consulta de versión por red) el chromedriver y recuerda su ruta."""
+    from webdriver_manager.chrome import ChromeDriverManager
+    print("⬇️ Descargando chromedriver compatible con tu Chrome...")
+    ruta = ChromeDriverManager().install()
+    with open(ARCHIVO_RUTA_DRIVER, 'w', encoding='utf-8') as f:
+        f.write(ruta)
+    return ruta
+
+
+def abrir_chrome(perfil="principal", wire=False, seleniumwire_options=None):
+    """Abre Chrome con el perfil persistente indicado (uno por navegador abierto a la vez).
+
+    wire=True usa selenium-wire (para interceptar el token de Collaborate).
+    """
+    if wire:
+        from seleniumwire import webdriver # captura respuestas de manera sileciosa
+    else:
+        from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service #el motor de chorme arranque correctamente en el sistema operativo
+    from selenium.common.exceptions import SessionNotCreatedException
+
+    options = webdriver.ChromeOptions()
+    options.add_argument('--ignore-certificate-errors') # le dice a chrome que no se detenga si se encuentra una alerta de red (comun en redes corporativas)
+    options.set_capability("acceptInsecureCerts", True)
+    options.add_argument("--start-maximized")
+    # Perfil propio del robot: conserva cookies y sesión entre corridas
+    options.add_argument(f"--user-data-dir={os.path.join(DIR_PERFILES, perfil)}")
+    extras = {'seleniumwire_options': seleniumwire_options or {}} if wire else {}
+
+    ruta = ruta_chromedriver()
+    if ruta is None:
+        ruta = instalar_chromedriver()
+        return webdriver.Chrome(service=Service(ruta), options=options, **extras)
+    try:
+        return webdriver.Chrome(service=Service(ruta), options=options, **extras)
+    except SessionNotCreatedException as e:
+        if 'version' not in str(e).lower():
+            raise # p. ej. el perfil ya está abierto en otro Chrome
+        # Chrome se actualizó y el driver guardado quedó viejo: se descarga el correcto
+        print("⚠️ El chromedriver guardado no es compatible con tu Chrome.")
+        return webdriver.Chrome(service=Service(instalar_chromedriver()), options=options, **extras)
+
+
+def cookies_como_texto(cookies):
+    """Cookies de Selenium -> "nombre=valor; nombre2=valor2" (para requests)."""
+    return "; ".join([f"{c['name']}={c['value']}" for c in cookies])
+
+
+def cookies_de_sesion(driver):
+    """Cookies de Blackboard del navegador ya logueado."""
+    # get_cookies() solo devuelve las del dominio actual: nos paramos en Blackboard antes de leerlas
+    driver.get(f"{URL_BLACKBOARD}/ultra/course")
+    return driver.get_cookies()
+
+
+def iniciar_sesion(driver):
+    """Deja el navegador con sesión en Blackboard: la del perfil si sigue vigente o login manual."""
+    if sesion_valida(cookies_como_texto(cookies_de_sesion(driver))):
+        print("✅ Sesión de Blackboard recuperada del perfil guardado (sin login manual).")
+        return
+    # 3. LOGIN MANUAL
+    driver.get(URL_LOGIN)
+    print("\n🔑 POR FAVOR, INICIA SESIÓN MANUALMENTE...")
+    input("👉 Presiona ENTER en esta consola cuando ya veas la lista de tus cursos...")
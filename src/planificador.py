@@ -0,0 +1,57 @@
+import pandas as pd
+
+# ==========================================
+# PLANIFICADOR DE VISITAS SEGÚN EL CALENDARIO DE SESIONES
+# ==========================================
+# Un curso solo puede tener grabaciones nuevas si tuvo una sesión que terminó después
+# de la última consulta exitosa. Con la agenda del ETL (supervisar_clases.parquet:
+# FECHAS, HORA_INICIO, HORA_FIN) y la hora de la última consulta de cada curso (tabla
+# 'marcas' del almacén) se visitan solo esos cursos, empezando por la sesión más reciente.
+
+# Collaborate tarda en publicar la grabación: una sesión que terminó hasta 12 h antes de
+# la última consulta se vuelve a revisar en la siguiente corrida.
+MARGEN_PUBLICACION = pd.Timedelta(hours=12)
+
+
+def fin_de_sesiones(df_agenda):
+    """Fecha y hora de término de cada sesión (HORA_FIN; si falta, HORA_INICIO; si no, fin del día)."""
+    fechas = pd.to_datetime(df_agenda['FECHAS'], errors='coerce').dt.normalize()
+    hora = df_agenda['HORA_FIN'].where(df_agenda['HORA_FIN'].notna(), df_agenda['HORA_INICIO'])
+    desfase = pd.to_timedelta(hora.astype('string'), errors='coerce') # datetime.time -> 'HH:MM:SS'
+    return fechas + desfase.fillna(pd.Timedelta(days=1) - pd.Timedelta(seconds=1))
+
+
+def ultima_sesion_terminada(df_agenda, ahora=None):
+    """Por ID: término de la sesión más reciente que ya terminó (las futuras no cuentan)."""
+    ahora = pd.Timestamp.now() if ahora is None else ahora
+    fines = fin_de_sesiones(df_agenda)
+    terminadas = fines <= ahora
+    return fines[terminadas].groupby(df_agenda.loc[terminadas, 'ID'].astype(str)).max()
+
+
+def planificar(cursos, df_agenda, actualizaciones, ahora=None, margen=MARGEN_PUBLICACION):
+    """Devuelve (cursos a visitar, cantidad omitida).
+
+    Se visita un curso si nunca se consultó con éxito, si su ID no está en la agenda
+    (por seguridad) o si tuvo una sesión terminada después de su última consulta
+    (menos el margen de publicación). Orden: sesión más reciente primero; los cursos
+    sin agenda van al final en su orden original.
+    """
+    if not cursos:
+        return [], 0
+    ultima_sesion = ultima_sesion_terminada(df_agenda, ahora)
+
+    df = pd.DataFrame({
+        'pos': range(len(cursos)),
+        'ID': [str(c['ID']) for c in cursos],
+        'ID_Interno': [c['ID_Interno'] for c in cursos],
+    })
+    df['ultima_sesion'] = df['ID'].map(ultima_sesion)
+    df['ultima_consulta'] = pd.to_datetime(df['ID_Interno'].map(actualizaciones), errors='coerce')
+
+    en_agenda = df['ID'].isin(set(df_agenda['ID'].astype(str)))
+    sesion_nueva = df['ultima_sesion'] > (df['ultima_consulta'] - margen)
+    visitar = df['ultima_consulta'].isna() | ~en_agenda | sesion_nueva.fillna(False)
+
+    elegidos = df[visitar].sort_values(['ultima_sesion', 'pos'], ascending=[False, True], na_position='last', kind='stable')
+    return [cursos[i] for i in elegidos['pos']], int((~visitar).sum())
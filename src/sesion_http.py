@@ -0,0 +1,141 @@
+import os
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse, parse_qs
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ==========================================
+# SESIÓN HTTP COMPARTIDA (SIN NAVEGADOR)
+# ==========================================
+# Una sola requests.Session para todo el robot: reutiliza conexiones (keep-alive),
+# reintenta con espera creciente y, con las cookies del login, permite hacer el
+# lanzamiento LTI de Collaborate sin abrir Chrome por curso.
+
+# Se pueden apuntar a un servidor local de pruebas con variables de entorno
+URL_BLACKBOARD = os.getenv("BB_BASE_URL", "https://upn.blackboard.com")
+URL_COLLAB = os.getenv("COLLAB_BASE_URL", "https://us-lti.bbcollab.com")
+
+# Usuario de la sesión actual: responde 200 solo si las cookies siguen vigentes
+RUTA_USUARIO_ACTUAL = "/learn/api/public/v1/users/me"
+
+# Página de Blackboard que arma el formulario LTI de Collaborate para un curso
+RUTA_LANZAMIENTO_LTI = "/webapps/collab-ultra/tool/collabultra/lti/launch?course_id={id_interno}"
+
+
+def crear_sesion(cookie_string=None, conexiones=20, reintentos=True):
+    """Session con pool de conexiones y reintentos (backoff) ante errores temporales.
+
+    Con reintentos=False los errores se devuelven tal cual (los maneja cliente_api.ClienteAPI).
+    """
+    sesion = requests.Session()
+    if reintentos:
+        reintentos = Retry(
+            total=3,
+            backoff_factor=0.5, # 0.5 s, 1 s, 2 s...
+            status_forcelist=[500, 502, 503, 504],
+            # Solo GET: reenviar el formulario LTI (mismo oauth_nonce) sería rechazado como repetición.
+            # Si el POST falla, el robot rehace el lanzamiento completo (formulario nuevo).
+            allowed_methods=["GET"]
+        )
+    else:
+        reintentos = 0
+    adaptador = HTTPAdapter(pool_connections=conexiones, pool_maxsize=conexiones, max_retries=reintentos)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    sesion.headers.update({"User-Agent": "Mozilla/5.0"}) # para que el servidor piense que es un humano
+    if cookie_string:
+        # Las cookies quedan atadas al dominio de Blackboard: no viajan a Collaborate
+        dominio = urlparse(URL_BLACKBOARD).hostname
+        for par in cookie_string.split(';'):
+            if '=' in par:
+                nombre, valor = par.strip().split('=', 1)
+                sesion.cookies.set(nombre, valor, domain=dominio)
+    return sesion
+
+
+def sesion_valida(cookie_string, timeout=10):
+    """True si Blackboard acepta estas cookies (una sola petición liviana)."""
+    if not cookie_string:
+        return False
+    try:
+        resp = crear_sesion(cookie_string, conexiones=1).get(URL_BLACKBOARD + RUTA_USUARIO_ACTUAL, timeout=timeout)
+    except requests.RequestException:
+        return False
+    return resp.status_code == 200
+
+
+def leer_cookies(ruta):
+    """Cookies guardadas por guardar_cookies() (texto "nombre=valor; ..."), o None si no hay."""
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def guardar_cookies(ruta, cookie_string):
+    """Guarda las cookies de la sesión en un archivo legible solo por el usuario actual (0600)."""
+    # os.open con permisos desde la creación: el archivo nunca existe legible para otros
+    descriptor = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.chmod(ruta, 0o600) # por si ya existía con otros permisos
+    with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+        f.write(cookie_string)
+
+
+
+    """Extrae el <form> autoenviable (action + inputs ocultos) de la página de lanzamiento."""
+
+    def __init__(self):
+        super().__init__()
+        self.action = None
+        self.campos = {}
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'form' and self.action is None:
+            self.action = attrs.get('action')
+        elif tag == 'input' and attrs.get('name'):
+            self.campos[attrs['name']] = attrs.get('value', '')
+
+
+def _buscar_token(respuesta):
+    """Busca el token de Collaborate en la URL final, en las redirecciones o en el HTML."""
+    for r in list(respuesta.history) + [respuesta]:
+        for url in (r.url, r.headers.get('Location', '')):
+            if not url:
+                continue
+            partes = urlparse(url)
+            # Collaborate deja el token en la query (?token=) o en el fragmento (#token=)
+            for texto in (partes.query, partes.fragment):
+                token = parse_qs(texto).get('token')
+                if token:
+                    return token[0]
+    encontrado = re.search(r'"token"\s*:\s*"([^"]+)"', respuesta.text or "")
+    return encontrado.group(1) if encontrado else None
+
+
+def obtener_token_lti(cliente, id_interno, timeout=10):
+    """Hace el lanzamiento LTI del curso por HTTP. Devuelve (código HTTP, 'Bearer <token>' o None).
+
+    cliente: requests.Session o cliente_api.ClienteAPI (mismo limitador que la API).
+    El código es el del paso que falló (200 si respondió bien pero sin token): con un 429/5xx
+    conviene repetir el lanzamiento completo más tarde, con un formulario nuevo.
+    """
+    url_lanzamiento = URL_BLACKBOARD + RUTA_LANZAMIENTO_LTI.format(id_interno=id_interno)
+    resp = cliente.get(url_lanzamiento, timeout=timeout)
+    if resp.status_code != 200:
+        return resp.status_code, None
+
+    formulario = FormularioLTI()
+    formulario.feed(resp.text)
+    if not formulario.action:
+        return resp.status_code, None
+
+    # El navegador enviaría este formulario solo (onload): lo enviamos nosotros
+    resp_lti = cliente.post(urljoin(resp.url, formulario.action), data=formulario.campos, timeout=timeout)
+    token = _buscar_token(resp_lti)
+    if token:
+        return 200, f"Bearer {token}"
+    return resp_lti.status_code, None
@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+
+# ==========================================
+# TELEMETRÍA DE LA CORRIDA (TRAMOS CON TIEMPO)
+# ==========================================
+# Cada fase del robot (navegar, token, API, parseo...) y cada paso del ETL se mide
+# como un "tramo" y se agrega como una línea JSON a 02_outputs/telemetria.jsonl.
+# El archivo se acumula entre corridas (cada una con su id 'corrida'), así se puede
+# comparar qué cursos o pasos se vuelven lentos noche tras noche con pandas:
+#     pd.read_json('02_outputs/telemetria.jsonl', lines=True)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARCHIVO_TELEMETRIA = os.path.join(BASE_DIR, "02_outputs", "telemetria.jsonl")
+
+# Límites (en segundos) de las barras del histograma de tiempo por curso
+LIMITES_HISTOGRAMA = [0.5, 1, 2, 5, 10, 20, 30, 60]
+
+
+class Telemetria:
+    """Registro de tramos seguro entre hilos. Sin 'ruta' solo guarda en memoria."""
+
+    def __init__(self, proceso, ruta=None):
+        self.proceso = proceso
+        self.corrida = datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.registros = []
+        self._candado = threading.Lock()
+        self._archivo = open(ruta, 'a', encoding='utf-8') if ruta else None
+
+    def registrar(self, etapa, segundos, **campos):
+        registro = {'corrida': self.corrida, 'proceso': self.proceso, 'etapa': etapa,
+                    'segundos': round(segundos, 4), 'hora': datetime.now().isoformat(timespec='seconds'), **campos}
+        with self._candado:
+            self.registros.append(registro)
+            if self._archivo:
+                # Una línea por tramo y flush inmediato: un cierre brusco no pierde lo ya medido
+                self._archivo.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+                self._archivo.flush()
+
+    @contextmanager
+    def tramo(self, etapa, **campos):
+        """with telemetria.tramo('api', curso=...): mide el bloque y lo registra (aunque falle)."""
+        inicio = time.perf_counter()
+        try:
+            yield campos # el bloque puede agregar datos (p. ej. campos['videos'] = 12)
+        finally:
+            self.registrar(etapa, time.perf_counter() - inicio, **campos)
+
+    def cerrar(self):
+        with self._candado:
+            if self._archivo:
+                self._archivo.close()
+                self._archivo = None
+
+    def resumen(self, top=5):
+        """Imprime el tiempo por etapa, el histograma de tiempo por curso y los cursos más lentos."""
+        with self._candado:
+            registros = list(self.registros)
+        if not registros:
+            return
+
+        print(f"\n⏱️ Tiempo por etapa ({self.proceso}):")
+        print(f"   {'Etapa':<14} {'N':>6} {'Total (s)':>10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'Máx (ms)':>9}")
+        etapas = {}
+        for r in registros:
+            etapas.setdefault(r['etapa'], []).append(r['segundos'])
+        for etapa, tiempos in etapas.items():
+            p50, p95 = np.percentile(tiempos, [50, 95]) * 1000
+            print(f"   {etapa:<14} {len(tiempos):>6} {sum(tiempos):>10.1f} {p50:>9.0f} {p95:>9.0f} {max(tiempos) * 1000:>9.0f}")
+
+        # Tiempo total de cada curso = suma de sus tramos
+        por_curso, nrcs = {}, {}
+        for r in registros:
+            if r.get('curso') is not None:
+                por_curso[r['curso']] = por_curso.get(r['curso'], 0.0) + r['segundos']
+                if r.get('nrc'):
+                    nrcs[r['curso']] = r['nrc']
+        if not por_curso:
+            return
+
+        print(f"\n📊 Tiempo por curso ({len(por_curso)} cursos):")
+        conteos, _ = np.histogram(list(por_curso.values()), bins=[0] + LIMITES_HISTOGRAMA + [float('inf')])
+        maximo = max(conteos)
+        etiquetas = [f"< {LIMITES_HISTOGRAMA[0]} s"] + \
+                    [f"{a}-{b} s" for a, b in zip(LIMITES_HISTOGRAMA, LIMITES_HISTOGRAMA[1:])] + \
+                    [f">= {LIMITES_HISTOGRAMA[-1]} s"]
+        for etiqueta, n in zip(etiquetas, conteos):
+            print(f"   {etiqueta:>9} | {'█' * int(round(30 * n / maximo)):<30} {n}")
+
+        print("\n🐢 Cursos más lentos:")
+        for curso, segundos in sorted(por_curso.items(), key=lambda x: x[1], reverse=True)[:top]:
+            nombre = f"NRC {nrcs[curso]} ({curso})" if curso in nrcs else curso
+            print(f"   {nombre}: {segundos:.1f} s")
+
+
+def abrir_telemetria(proceso, ruta=ARCHIVO_TELEMETRIA):
+    """Telemetría que agrega sus tramos al archivo de la carpeta 02_outputs."""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    return Telemetria(proceso, ruta)
+
+
+class BarraProgreso:
+    """Barra de progreso con ETA en la última línea de la consola.
+
+    Mientras está activa reemplaza a sys.stdout: los print() de los hilos se escriben
+    encima de la barra y luego se vuelve a dibujar, así no se mezclan. Si la salida
+    no es una terminal (p. ej. redirigida a un archivo) solo deja pasar los print().
+    """
+
+    def __init__(self, total, titulo="Cursos", ancho=30):
+        self.total = total
+        self.titulo = titulo
+        self.ancho = ancho
+        self.hechos = 0
+        self.inicio = time.perf_counter()
+        self._pendiente = ""
+        self._candado = threading.RLock()
+        self._salida = None
+        self._largo_barra = 0
+        self._pausada = False
+
+    def __enter__(self):
+        self._salida = sys.stdout
+        self._interactiva = self._salida.isatty()
+        self.inicio = time.perf_counter()
+        sys.stdout = self
+        self._dibujar()
+        return self
+
+    def __exit__(self, *exc):
+        with self._candado:
+            if self._pendiente:
+                self.write("\n")
+            sys.stdout = self._salida
+            if self._interactiva:
+                self._salida.write("\n")
+            print(f"⏱️ {self.titulo}: {self.hechos}/{self.total} en {self._formato(time.perf_counter() - self.inicio)}")
+        return False
+
+    @contextmanager
+    def pausa(self):
+        """Saca la barra de la consola mientras dura el bloque (p. ej. un login manual con input()).
+
+        La consola vuelve a ser la original y ese tiempo no cuenta en el transcurrido ni en el ETA.
+        """
+        with self._candado:
+            self.flush()
+            self._borrar()
+            self._largo_barra = 0
+            self._pausada = True
+            sys.stdout = self._salida
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._candado:
+                self.inicio += time.perf_counter() - inicio
+                self._pausada = False
+                sys.stdout = self
+                self._dibujar()
+
+    def avanzar(self, cantidad=1):
+        with self._candado:
+            self.hechos += cantidad
+            self._dibujar()
+
+    # --- Interfaz de archivo (para reemplazar a sys.stdout) ---
+    def write(self, texto):
+        with self._candado:
+            self._pendiente += texto
+            if "\n" not in self._pendiente:
+                return len(texto)
+            lineas, self._pendiente = self._pendiente.rsplit("\n", 1)
+            self._borrar()
+            self._salida.write(lineas + "\n")
+            self._largo_barra = 0 # la barra ya quedó borrada: se dibuja en la línea nueva
+            self._dibujar()
+        return len(texto)
+
+    def flush(self):
+        # Un texto sin salto de línea (p. ej. el mensaje de input()) se muestra ya, no con la próxima línea
+        with self._candado:
+            if self._pendiente:
+                self._borrar()
+                self._salida.write(self._pendiente)
+                self._pendiente = ""
+                self._largo_barra = 0
+            self._salida.flush()
+
+    def isatty(self):
+        return self._salida.isatty()
+
+    # --- Dibujo ---
+    @staticmethod
+    def _formato(segundos):
+        minutos, segundos = divmod(int(segundos), 60)
+        return f"{minutos:02d}:{segundos:02d}"
+
+    def _borrar(self):
+        if self._interactiva and self._largo_barra:
+            self._salida.write("\r" + " " * self._largo_barra + "\r")
+
+    def _dibujar(self):
+        if not self._interactiva or self._pausada:
+            return
+        # Sin cursos (total 0) no hay nada pendiente: la barra se muestra completa, "0/0 (100%)"
+        fraccion = min(self.hechos / self.total, 1.0) if self.total else 1.0
+        llenos = int(self.ancho * fraccion)
+        transcurrido = time.perf_counter() - self.inicio
+        eta = transcurrido / self.hechos * (self.total - self.hechos) if self.hechos else 0
+        barra = (f"{self.titulo} [{'█' * llenos}{'░' * (self.ancho - llenos)}] {self.hechos}/{self.total} "
+                 f"({fraccion:.0%}) | {self._formato(transcurrido)} | ETA {self._formato(eta) if self.hechos else '--:--'}")
+        self._borrar()
+        self._salida.write(barra)
+        self._salida.flush()
+        self._largo_barra = len(barra)